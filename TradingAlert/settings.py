@@ -91,6 +91,28 @@ DATABASES = {
 }
 
 
+# Cache
+# Also coordinates identical Angel One requests across worker processes, so
+# point it at a shared backend (e.g. Redis) when running several workers.
+
+CACHES = {
+    'default': {
+        'BACKEND': os.getenv('CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.getenv('CACHE_LOCATION', ''),
+    }
+}
+
+
+# Market data
+# 'angelone' (live), 'synthetic' (seeded random walk) or 'replay' (recorded candles)
+
+MARKET_DATA_PROVIDER = os.getenv('MARKET_DATA_PROVIDER', 'angelone')
+
+# Serve synthetic candles when Angel One fails and no stored candles exist.
+# Development only: alerts would be evaluated on random prices.
+ALLOW_SYNTHETIC_FALLBACK = os.getenv('ALLOW_SYNTHETIC_FALLBACK', 'False') == 'True'
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.1/ref/settings/#auth-password-validators
 
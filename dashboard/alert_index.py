@@ -0,0 +1,178 @@
+import threading
+
+from .shared_cache import shared_cache, is_shared
+
+VERSION_KEY = 'alert_index:version'
+
+
+class AlertIndex:
+    """Inverted index from (symbol, timeframe) to the active alerts watching it
+
+    Group alerts are expanded to one entry per stock in the group. The index
+    is kept current in the process that changes alerts through model signals
+    (see dashboard/signals.py); every change also bumps a version number in
+    the Django cache, and other processes rebuild their copy when it moves.
+    With a process-local cache backend that number never reaches the other
+    processes, so refresh() rebuilds the index instead.
+    """
+
+    def __init__(self):
+        self._series = {}
+        self._alerts = {}
+        self._built = False
+        self._version = None
+        self._lock = threading.RLock()
+        self.rebuilds = 0
+
+    @staticmethod
+    def alert_series(alert, symbols=None):
+        """Get the (symbol, timeframe) keys an alert depends on"""
+        if not alert.is_active:
+            return set()
+        if alert.alert_type == 'single':
+            return {(alert.stock.symbol, alert.timeframe)} if alert.stock_id else set()
+        if not alert.stock_group_id:
+            return set()
+        if symbols is None:
+            symbols = alert.stock_group.stocks.values_list('symbol', flat=True)
+        return {(symbol, alert.timeframe) for symbol in symbols}
+
+    def _shared_version(self):
+        cache = shared_cache()
+        if cache is None:
+            return None
+        try:
+            return cache.get(VERSION_KEY)
+        except Exception as e:
+            print(f"Cache unavailable for alert index: {str(e)}")
+            return None
+
+    def _set(self, alert_id, keys):
+        for key in self._alerts.pop(alert_id, ()):
+            subscribers = self._series.get(key)
+            if subscribers is not None:
+                subscribers.discard(alert_id)
+                if not subscribers:
+                    del self._series[key]
+        if keys:
+            self._alerts[alert_id] = keys
+            for key in keys:
+                self._series.setdefault(key, set()).add(alert_id)
+
+    def rebuild(self):
+        """Rebuild the index from every active alert"""
+        from .models import Alert
+
+        alerts = Alert.objects.filter(is_active=True).select_related(
+            'stock', 'stock_group'
+        ).prefetch_related('stock_group__stocks')
+
+        with self._lock:
+            version = self._shared_version()
+            self._series = {}
+            self._alerts = {}
+            for alert in alerts:
+                symbols = None
+                if alert.alert_type != 'single' and alert.stock_group_id:
+                    symbols = [stock.symbol for stock in alert.stock_group.stocks.all()]
+                self._set(alert.pk, self.alert_series(alert, symbols))
+            self._built = True
+            self._version = version
+            self.rebuilds += 1
+
+    def _ensure(self):
+        with self._lock:
+            if not self._built:
+                self.rebuild()
+                return
+            version = self._shared_version()
+            if version is not None and version != self._version:
+                self.rebuild()
+
+    def refresh(self):
+        """Pick up alert changes made in other processes, once per evaluation cycle
+
+        Checks the shared version when the Django cache is shared between
+        processes, and rebuilds the index from the database when it is not.
+        """
+        if is_shared():
+            self._ensure()
+        else:
+            self.rebuild()
+
+    def _touch(self):
+        """Bump the shared version after a local change"""
+        cache = shared_cache()
+        if cache is None:
+            return
+        try:
+            try:
+                version = cache.incr(VERSION_KEY)
+            except ValueError:
+                version = 1
+                cache.set(VERSION_KEY, version, None)
+        except Exception as e:
+            print(f"Cache unavailable for alert index: {str(e)}")
+            return
+
+        # If another process also changed alerts, this copy is behind too
+        if self._version is not None and version == self._version + 1:
+            self._version = version
+        else:
+            self._built = False
+
+    def update_alert(self, alert):
+        """Re-index an alert after it was created or modified"""
+        with self._lock:
+            if self._built:
+                self._set(alert.pk, self.alert_series(alert))
+            self._touch()
+
+    def remove_alert(self, alert_id):
+        """Drop a deleted alert from the index"""
+        with self._lock:
+            if self._built:
+                self._set(alert_id, None)
+            self._touch()
+
+    def update_groups(self, group_ids=None):
+        """Re-index the alerts on stock groups whose members changed (None for every group)"""
+        from .models import Alert
+
+        with self._lock:
+            if self._built:
+                alerts = Alert.objects.filter(alert_type='multiple').select_related('stock_group')
+                if group_ids is not None:
+                    alerts = alerts.filter(stock_group_id__in=group_ids)
+                for alert in alerts:
+                    self._set(alert.pk, self.alert_series(alert))
+            self._touch()
+
+    def invalidate(self):
+        """Rebuild the index on next use, e.g. after a stock was renamed"""
+        with self._lock:
+            self._built = False
+            self._touch()
+
+    def alert_ids(self, symbol, timeframe):
+        """Get the ids of the active alerts watching a symbol on a timeframe"""
+        self._ensure()
+        with self._lock:
+            return set(self._series.get((symbol, timeframe), ()))
+
+    def series(self, timeframes=None):
+        """Get every (symbol, timeframe) with at least one active alert, optionally for some timeframes"""
+        self._ensure()
+        with self._lock:
+            return [
+                key for key in self._series
+                if timeframes is None or key[1] in timeframes
+            ]
+
+    def symbols(self):
+        """Get every symbol that some active alert depends on"""
+        return {symbol for symbol, _ in self.series()}
+
+
+# Alert index shared by the evaluation engine and the fetchers in this process
+alert_index = AlertIndex()
@@ -5,12 +5,16 @@ from dotenv import load_dotenv
 load_dotenv(override=True)
 
 import pandas as pd
-from datetime import datetime, timedelta
 import requests
 import json
-import ta  # Technical analysis library for indicators
 import time
 import random
+import threading
+
+from .rate_limit import rate_limiter
+from .instruments import resolve_token
+from .single_flight import single_flight
+from .indicator_frame import IndicatorFrame
 
 
 class AngelOneAPI:
@@ -19,6 +23,9 @@ class AngelOneAPI:
         self.client_id = os.getenv('ANGEL_CLIENT_ID')
         self.password = os.getenv('ANGEL_PASSWORD')
         self.token = os.getenv('ANGEL_TOKEN')
+        self.refresh_token = os.getenv('ANGEL_REFRESH_TOKEN')
+        self.totp_secret = os.getenv('ANGEL_TOTP_SECRET')
+        self.feed_token = os.getenv('ANGEL_FEED_TOKEN')
         self.client_local_ip = os.getenv('CLIENT_LOCAL_IP', '192.168.56.1')
         self.client_public_ip = os.getenv('CLIENT_PUBLIC_IP', '43.241.193.61')
         self.mac_address = os.getenv('MAC_ADDRESS', 'C0-35-32-51-AA-3B')
@@ -27,6 +34,9 @@ class AngelOneAPI:
         self.retry_count = 3
         self.retry_delay = 2  # seconds between retries
         
+    # Maximum number of tokens the market quote API accepts per request
+    MAX_QUOTE_TOKENS = 50
+        
     def connect(self):
         """Initialize connection to Angel One API with retry logic"""
         for attempt in range(self.retry_count):
@@ -41,7 +51,7 @@ class AngelOneAPI:
                 )
                 
                 # Test connection by getting profile
-                profile = self.smart_api.getProfile()
+                profile = self.smart_api.getProfile(self.refresh_token)
                 if profile.get('status'):
                     print(f"Successfully connected to Angel One API for user {profile.get('data', {}).get('name', 'Unknown')}")
                     return True
@@ -66,6 +76,49 @@ class AngelOneAPI:
         print(f"Failed to connect after {self.retry_count} attempts.")
         return False
     
+    def is_session_valid(self):
+        """Check whether the current session token is still accepted"""
+        if not self.smart_api:
+            return False
+            
+        try:
+            profile = self.smart_api.getProfile(self.refresh_token)
+            return bool(profile and profile.get('status'))
+        except Exception as e:
+            print(f"Error validating Angel One session: {str(e)}")
+            return False
+            
+    def refresh_session(self):
+        """Obtain a new session token using the refresh token, or log in again with TOTP"""
+        try:
+            if self.smart_api and self.refresh_token:
+                session = self.smart_api.generateToken(self.refresh_token)
+            elif self.totp_secret:
+                import pyotp
+                self.smart_api = SmartConnect(api_key=self.api_key)
+                session = self.smart_api.generateSession(
+                    self.client_id, self.password, pyotp.TOTP(self.totp_secret).now()
+                )
+            else:
+                print("No refresh token or TOTP secret configured. Please get a new token.")
+                return False
+                
+            if not session or not session.get('status'):
+                print(f"Token refresh failed: {(session or {}).get('message', 'Unknown error')}")
+                return False
+                
+            data = session.get('data', {})
+            self.token = data.get('jwtToken', '').replace('Bearer ', '')
+            self.refresh_token = data.get('refreshToken', self.refresh_token)
+            self.feed_token = data.get('feedToken', self.feed_token)
+            self.smart_api.setAccessToken(self.token)
+            print("Refreshed Angel One session token")
+            return True
+            
+        except Exception as e:
+            print(f"Error refreshing Angel One session: {str(e)}")
+            return False
+    
     def get_headers(self):
         """Get headers for API requests"""
         return {
@@ -82,17 +135,75 @@ class AngelOneAPI:
             
     def get_quote(self, exchange, symbol_token):
         """Get quote for a symbol using REST API with retry logic"""
+        return self._post_quote({exchange: [symbol_token]})
+        
+    def get_quotes(self, instruments, mode="FULL"):
+        """Get quotes for many symbols, packing up to MAX_QUOTE_TOKENS tokens into each request
+        
+        Args:
+            instruments (dict): {symbol: (exchange, symbol_token)}
+            mode (str): Quote mode, one of 'LTP', 'OHLC' or 'FULL'
+            
+        Returns:
+            dict: {symbol: quote data} for every symbol the broker returned
+        """
+        # Map each (exchange, token) back to the caller's symbol
+        symbols_by_token = {
+            (exchange, str(token)): symbol
+            for symbol, (exchange, token) in instruments.items()
+        }
+        keys = list(symbols_by_token)
+        
+        quotes = {}
+        for start in range(0, len(keys), self.MAX_QUOTE_TOKENS):
+            exchange_tokens = {}
+            for exchange, token in keys[start:start + self.MAX_QUOTE_TOKENS]:
+                exchange_tokens.setdefault(exchange, []).append(token)
+                
+            response = self._post_quote(exchange_tokens, mode)
+            if not response or not response.get('status'):
+                print(f"Error fetching quotes for {sum(len(t) for t in exchange_tokens.values())} symbols")
+                continue
+                
+            for quote in response.get('data', {}).get('fetched', []):
+                symbol = symbols_by_token.get((quote.get('exchange'), str(quote.get('symbolToken'))))
+                if symbol:
+                    quotes[symbol] = quote
+                    
+        return quotes
+        
+    def get_ltps(self, instruments):
+        """Get Last Traded Prices for many symbols in batched requests
+        
+        Args:
+            instruments (dict): {symbol: (exchange, symbol_token)}
+            
+        Returns:
+            dict: {symbol: ltp}
+        """
+        quotes = self.get_quotes(instruments, mode="LTP")
+        return {symbol: quote.get('ltp') for symbol, quote in quotes.items()}
+        
+    def _post_quote(self, exchange_tokens, mode="FULL"):
+        """Post one market quote request, sharing the result with identical concurrent requests"""
+        key = "quote:{}:{}".format(mode, json.dumps(
+            {exchange: sorted(map(str, tokens)) for exchange, tokens in exchange_tokens.items()},
+            sort_keys=True
+        ))
+        return single_flight.do(key, lambda: self._request_quote(exchange_tokens, mode))
+        
+    def _request_quote(self, exchange_tokens, mode="FULL"):
+        """Post one market quote request with retry logic"""
         for attempt in range(self.retry_count):
             try:
                 endpoint = "/rest/secure/angelbroking/market/v1/quote/"
                 payload = {
-                    "mode": "FULL",
-                    "exchangeTokens": {
-                        exchange: [symbol_token]
-                    }
+                    "mode": mode,
+                    "exchangeTokens": exchange_tokens
                 }
                 
                 headers = self.get_headers()
+                rate_limiter.acquire('quote')
                 response = requests.post(
                     f"{self.base_url}{endpoint}",
                     headers=headers,
@@ -100,9 +211,13 @@ class AngelOneAPI:
                 )
                 
                 if response.status_code == 200:
+                    rate_limiter.reward('quote')
                     return response.json()
                 elif response.status_code == 429:
+                    # The limiter slows down; no extra sleep needed before retrying
                     print("Rate limit exceeded. Waiting before retry...")
+                    rate_limiter.penalize('quote')
+                    continue
                 else:
                     print(f"Error fetching quote: {response.status_code}, {response.text}")
                     
@@ -117,27 +232,52 @@ class AngelOneAPI:
                 
         return None
             
-    def get_historical_data(self, symbol, exchange, interval, from_date, to_date):
+    def get_historical_data(self, symbol, exchange, interval, from_date, to_date, attempts=None):
+        """Get historical data for a symbol, sharing the result with identical concurrent requests
+        
+        attempts caps the tries (default retry_count); pass 1 to fail fast
+        instead of sleeping between retries.
+        """
+        key = f"candles:{exchange}:{symbol}:{interval}:{from_date}:{to_date}"
+        return single_flight.do(
+            key, lambda: self._request_historical_data(symbol, exchange, interval, from_date, to_date, attempts)
+        )
+        
+    def _request_historical_data(self, symbol, exchange, interval, from_date, to_date, attempts=None):
         """Get historical data for a symbol with improved error handling"""
-        for attempt in range(self.retry_count):
+        attempts = attempts or self.retry_count
+        for attempt in range(attempts):
             try:
                 if not self.smart_api:
                     if not self.connect():
                         return None
                         
+                symbol_token = resolve_token(symbol, exchange)
+                if symbol_token is None:
+                    print(f"Unknown symbol {symbol} on {exchange}; skipping historical data request")
+                    return None
+                    
                 params = {
                     "exchange": exchange,
-                    "symboltoken": symbol,
+                    "symboltoken": symbol_token,
                     "interval": interval,
                     "fromdate": from_date,
                     "todate": to_date
                 }
                 
-                # Add a small delay to avoid rate limiting
-                time.sleep(0.5 + random.uniform(0, 0.5))
+                # Wait for the shared limiter instead of sleeping unconditionally
+                rate_limiter.acquire('candle')
                 
                 data = self.smart_api.getCandleData(params)
                 
+                # SmartConnect wraps the candles in a status envelope
+                if isinstance(data, dict):
+                    if not data.get('status'):
+                        raise Exception(data.get('message') or data.get('errorcode') or 'Unknown error')
+                    data = data.get('data') or []
+                    
+                rate_limiter.reward('candle')
+                
                 # Convert to pandas DataFrame
                 df = pd.DataFrame(data)
                 if not df.empty:
@@ -145,55 +285,44 @@ class AngelOneAPI:
                     df['timestamp'] = pd.to_datetime(df['timestamp'])
                     df.set_index('timestamp', inplace=True)
                     
-                    # Add technical indicators
-                    self.add_indicators(df)
+                    # Indicators are added lazily by callers that need them
                     return df
                     
             except Exception as e:
                 # Check for rate limit
                 if "rate" in str(e).lower() or "access denied" in str(e).lower():
+                    # The limiter slows down; no extra sleep needed before retrying
                     print(f"Rate limit exceeded. Waiting before retry...")
+                    rate_limiter.penalize('candle')
+                    continue
+                elif "token" in str(e).lower() or "expired" in str(e).lower():
+                    print(f"Session token rejected. Refreshing before retry...")
+                    self.refresh_session()
                 else:
                     print(f"Attempt {attempt+1}: Error fetching historical data: {str(e)}")
                 
             # Wait before retrying with exponential backoff
-            if attempt < self.retry_count - 1:
+            if attempt < attempts - 1:
                 delay = self.retry_delay * (2 ** attempt) + random.uniform(0.5, 2.0)
                 print(f"Retrying in {delay:.2f} seconds...")
                 time.sleep(delay)
                 
-        print(f"Failed to get historical data for {symbol} after {self.retry_count} attempts.")
+        print(f"Failed to get historical data for {symbol} after {attempts} attempts.")
         return None
     
     def add_indicators(self, dataframe):
-        """Add technical indicators to the dataframe"""
+        """Add technical indicators to the dataframe
+        
+        The indicators (rsi, macd, macd_signal, macd_histogram, bollinger_*,
+        sma_<window>, ema_<window>, atr) are computed when first accessed;
+        call materialize() on the result before reading rows.
+        """
         if dataframe is None or dataframe.empty:
             return None
         
-        # Add RSI (Relative Strength Index)
-        dataframe['rsi'] = ta.momentum.RSIIndicator(dataframe['close']).rsi()
-        
-        # Add MACD (Moving Average Convergence Divergence)
-        macd = ta.trend.MACD(dataframe['close'])
-        dataframe['macd'] = macd.macd()
-        dataframe['macd_signal'] = macd.macd_signal()
-        dataframe['macd_histogram'] = macd.macd_diff()
-        
-        # Add Bollinger Bands
-        bollinger = ta.volatility.BollingerBands(dataframe['close'])
-        dataframe['bollinger_high'] = bollinger.bollinger_hband()
-        dataframe['bollinger_low'] = bollinger.bollinger_lband()
-        dataframe['bollinger_mid'] = bollinger.bollinger_mavg()
-        
-        # Add Moving Averages
-        dataframe['sma_20'] = ta.trend.SMAIndicator(dataframe['close'], window=20).sma_indicator()
-        dataframe['sma_50'] = ta.trend.SMAIndicator(dataframe['close'], window=50).sma_indicator()
-        dataframe['sma_200'] = ta.trend.SMAIndicator(dataframe['close'], window=200).sma_indicator()
-        
-        # Add ATR (Average True Range)
-        dataframe['atr'] = ta.volatility.AverageTrueRange(dataframe['high'], dataframe['low'], dataframe['close']).average_true_range()
-        
-        return dataframe
+        if isinstance(dataframe, IndicatorFrame):
+            return dataframe
+        return IndicatorFrame(dataframe)
             
     def check_alerts(self, dataframe, symbol, conditions):
         """Check if any alert conditions are met"""
@@ -201,6 +330,7 @@ class AngelOneAPI:
             return []
             
         alerts = []
+        dataframe = self.add_indicators(dataframe).materialize()
         latest = dataframe.iloc[-1]
         
         # Example conditions (customize based on your requirements)
@@ -245,10 +375,18 @@ class AngelOneAPI:
                 if not self.connect():
                     return None
                     
-            ltp_data = self.smart_api.ltpData(exchange, symbol, symbol)
+            symbol_token = resolve_token(symbol, exchange)
+            if symbol_token is None:
+                print(f"Unknown symbol {symbol} on {exchange}")
+                return None
+                
+            rate_limiter.acquire('ltp')
+            ltp_data = self.smart_api.ltpData(exchange, symbol, symbol_token)
             return ltp_data['ltp']
             
         except Exception as e:
+            if "rate" in str(e).lower() or "access denied" in str(e).lower():
+                rate_limiter.penalize('ltp')
             print(f"Error fetching LTP: {str(e)}")
             return None
             
@@ -259,10 +397,15 @@ class AngelOneAPI:
                 if not self.connect():
                     return None
                     
+            symbol_token = resolve_token(symbol, exchange)
+            if symbol_token is None:
+                print(f"Unknown symbol {symbol} on {exchange}; order not placed")
+                return None
+                
             order_params = {
                 "variety": "NORMAL",
                 "tradingsymbol": symbol,
-                "symboltoken": symbol,
+                "symboltoken": symbol_token,
                 "transactiontype": buy_sell,
                 "quantity": quantity,
                 "producttype": "INTRADAY",
@@ -274,9 +417,72 @@ class AngelOneAPI:
                 "triggerprice": "0"
             }
             
+            rate_limiter.acquire('order')
             order_id = self.smart_api.placeOrder(order_params)
             return order_id
             
         except Exception as e:
+            if "rate" in str(e).lower() or "access denied" in str(e).lower():
+                rate_limiter.penalize('order')
             print(f"Error placing order: {str(e)}")
-            return None 
\ No newline at end of file
+            return None
+
+
+class AngelOneSession:
+    """Process-wide owner of one authenticated AngelOneAPI per worker
+
+    The connection is created on first use and re-validated lazily, at most once
+    every validate_interval seconds, instead of on every fetch. A forked worker
+    never reuses its parent's connection. After a failed connection attempt,
+    callers get None straight away for retry_interval seconds instead of each
+    connecting again in turn.
+    """
+    
+    def __init__(self, validate_interval=900, retry_interval=30):
+        self.validate_interval = validate_interval
+        self.retry_interval = retry_interval
+        self._api = None
+        self._pid = None
+        self._validated_at = 0
+        self._failed_at = None
+        self._lock = threading.Lock()
+        
+    def get_api(self):
+        """Get the shared, connected AngelOneAPI, or None if it cannot be authenticated"""
+        with self._lock:
+            if self._api is None or self._pid != os.getpid():
+                if self._failed_at is not None and self._pid == os.getpid() \
+                        and time.monotonic() - self._failed_at < self.retry_interval:
+                    return None
+                    
+                api = AngelOneAPI()
+                self._pid = os.getpid()
+                if not api.connect() and not (api.refresh_session() and api.is_session_valid()):
+                    self._api = None
+                    self._failed_at = time.monotonic()
+                    return None
+                    
+                self._api = api
+                self._failed_at = None
+                self._validated_at = time.monotonic()
+                
+            elif time.monotonic() - self._validated_at > self.validate_interval:
+                if not self._api.is_session_valid():
+                    print("Angel One session expired. Refreshing token...")
+                    if not self._api.refresh_session() and not self._api.connect():
+                        self._api = None
+                        self._failed_at = time.monotonic()
+                        return None
+                        
+                self._validated_at = time.monotonic()
+                
+            return self._api
+
+
+# Shared session for this worker process
+session = AngelOneSession()
+
+
+def get_angel_one_api():
+    """Get the worker's shared, connected AngelOneAPI instance"""
+    return session.get_api()
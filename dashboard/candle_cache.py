@@ -0,0 +1,163 @@
+import threading
+import pandas as pd
+
+from .market_calendar import SESSION_CLOSE, market_calendar, session_bar_starts, to_ist
+from .shared_candles import shared_candles
+
+
+# Length of one bar for every timeframe that can be chosen on an Alert
+TIMEFRAME_DELTAS = {
+    '1min': pd.Timedelta(minutes=1),
+    '5min': pd.Timedelta(minutes=5),
+    '15min': pd.Timedelta(minutes=15),
+    '4h': pd.Timedelta(hours=4),
+    '1day': pd.Timedelta(days=1),
+    '1week': pd.Timedelta(weeks=1),
+}
+
+
+def current_bar_start(timeframe, now=None):
+    """Get the start timestamp of the bar that is currently forming for a timeframe
+
+    Bars are aligned to the session like the rolled-up series (see
+    session_bar_starts), so the 4h bars start at 09:15 and 13:15 IST. The
+    last bar of a trading day is complete at the close, so from then until
+    the next open the current bar starts at the close.
+
+    Parameters:
+    timeframe (str): Alert timeframe (e.g., '1min', '5min', '15min', '4h', '1day', '1week')
+    now (pd.Timestamp): Reference time, defaults to the current time (naive values are IST)
+
+    Returns:
+    pd.Timestamp: Start of the current bar, in IST
+    """
+    if timeframe not in TIMEFRAME_DELTAS:
+        timeframe = '1day'
+    now = to_ist(now)
+    bar_start = session_bar_starts(pd.DatetimeIndex([now]), timeframe)[0]
+
+    session_close = now.normalize() + SESSION_CLOSE
+    if now >= session_close and market_calendar.is_trading_day(now.date()):
+        return session_close
+    return bar_start
+
+
+class CandleCache:
+    """Shared cache of candle frames for one evaluation cycle
+
+    Frames are keyed by (symbol, timeframe, namespace) and tagged with the bar
+    they were fetched in, so every alert watching the same series during a cycle
+    gets the same frame and the entry is dropped as soon as a new bar starts.
+    The namespace separates e.g. raw base series from the frames derived from them.
+    Frames fetched with shared=True are also published to the other worker
+    processes on the host (see SharedCandleCache), and looked up there
+    before fetching.
+    """
+
+    def __init__(self):
+        self._frames = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.shared_hits = 0
+
+    def get_or_fetch(self, symbol, timeframe, fetch, now=None, namespace='frame', size=None, shared=False):
+        """Return the cached frame for the current bar, calling fetch() on a miss
+
+        Parameters:
+        symbol (str): The trading symbol
+        timeframe (str): Alert timeframe
+        fetch (callable): Zero-argument callable returning a DataFrame or None
+        now (pd.Timestamp): Reference time, defaults to the current time
+        namespace (str): Kind of frame cached under this key
+        size (int): How much history the caller needs (e.g. bars); a frame
+                    cached for a smaller size is fetched again
+        shared (bool): Share the frame with the other worker processes on the host
+
+        Returns:
+        pandas.DataFrame: The shared frame (must not be modified by callers) or None
+        """
+        key = (symbol, timeframe, namespace)
+        bar_start = current_bar_start(timeframe, now)
+
+        with self._lock:
+            entry = self._frames.get(key)
+            if entry is not None:
+                if entry[0] == bar_start:
+                    # A frame cached for a shorter lookback is fetched again with more history
+                    if size is None or entry[2] is None or entry[2] >= size:
+                        self.hits += 1
+                        return entry[1]
+                else:
+                    # A new bar has started since this frame was fetched
+                    del self._frames[key]
+                    self.evictions += 1
+
+            self.misses += 1
+
+        if shared:
+            df = shared_candles.get(symbol, timeframe, bar_start, size, namespace)
+            if df is not None:
+                with self._lock:
+                    self.shared_hits += 1
+                    self._frames[key] = (bar_start, df, size)
+                return df
+
+        df = fetch()
+
+        if df is not None:
+            self.put(symbol, timeframe, df, now, namespace, size, shared)
+
+        return df
+
+    def put(self, symbol, timeframe, df, now=None, namespace='frame', size=None, shared=False):
+        """Cache a frame for the current bar, e.g. one refreshed in the background"""
+        bar_start = current_bar_start(timeframe, now)
+        with self._lock:
+            self._frames[(symbol, timeframe, namespace)] = (bar_start, df, size)
+        if shared:
+            shared_candles.put(symbol, timeframe, bar_start, df, size, namespace)
+
+    def invalidate(self, symbol, namespace=None):
+        """Drop every cached frame of a symbol, or only those of one namespace"""
+        with self._lock:
+            for key in [key for key in self._frames if key[0] == symbol and namespace in (None, key[2])]:
+                del self._frames[key]
+
+    def evict_expired(self, now=None):
+        """Drop every frame whose bar has rolled over"""
+        with self._lock:
+            expired = [
+                key for key, (bar_start, _, _) in self._frames.items()
+                if current_bar_start(key[1], now) != bar_start
+            ]
+            for key in expired:
+                del self._frames[key]
+            self.evictions += len(expired)
+
+        return len(expired)
+
+    def clear(self):
+        """Remove all cached frames and reset the counters"""
+        with self._lock:
+            self._frames.clear()
+            self.hits = 0
+            self.misses = 0
+            self.evictions = 0
+            self.shared_hits = 0
+
+    def stats(self):
+        """Get cache counters"""
+        with self._lock:
+            return {
+                'entries': len(self._frames),
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'shared_hits': self.shared_hits,
+            }
+
+
+# Process-wide cache shared by every alert evaluated in this worker
+candle_cache = CandleCache()
@@ -0,0 +1,107 @@
+import numpy as np
+import pandas as pd
+
+from .candle_store import OHLCV_COLUMNS
+from .market_calendar import IST, to_ist
+
+
+class CandleRing:
+    """Fixed-capacity OHLCV series in contiguous NumPy arrays, oldest bar first
+
+    Timestamps are int64 nanoseconds since the epoch (UTC), prices float32
+    by default and volumes int64. Every bar is written twice, at its slot
+    and at slot + capacity, so the latest bars are always one contiguous
+    slice: column() returns views without copying, and append() writes in
+    place without allocating. Views show the series as of the time they
+    were taken and are overwritten by later appends, so copy what has to
+    outlive the next bar.
+    """
+
+    def __init__(self, capacity, price_dtype=np.float32):
+        self.capacity = capacity
+        self._timestamps = np.zeros(2 * capacity, dtype=np.int64)
+        self._prices = {
+            name: np.zeros(2 * capacity, dtype=price_dtype)
+            for name in ('open', 'high', 'low', 'close')
+        }
+        self._volumes = np.zeros(2 * capacity, dtype=np.int64)
+        self._columns = dict(self._prices, volume=self._volumes)
+        self._next = 0
+        self._length = 0
+
+    def __len__(self):
+        return self._length
+
+    def _window(self):
+        start = self._next - self._length
+        if start < 0:
+            start += self.capacity
+        return slice(start, start + self._length)
+
+    def append(self, timestamp, open, high, low, close, volume):
+        """Add one bar after the newest, dropping the oldest when full"""
+        slot, mirror = self._next, self._next + self.capacity
+        value = to_ist(timestamp).value
+        for position in (slot, mirror):
+            self._timestamps[position] = value
+            self._prices['open'][position] = open
+            self._prices['high'][position] = high
+            self._prices['low'][position] = low
+            self._prices['close'][position] = close
+            self._volumes[position] = volume
+
+        self._next = (self._next + 1) % self.capacity
+        self._length = min(self._length + 1, self.capacity)
+
+    def extend(self, frame):
+        """Add the bars of an OHLCV DataFrame indexed by timestamp, keeping the newest that fit"""
+        frame = frame.tail(self.capacity)
+        if frame.empty:
+            return
+
+        index = pd.DatetimeIndex(frame.index)
+        if index.tz is None:
+            index = index.tz_localize(IST)
+        values = {'timestamp': index.as_unit('ns').asi8}
+        values.update({name: frame[name].to_numpy() for name in OHLCV_COLUMNS})
+
+        # Write in runs of consecutive slots, wrapping around the end of the ring at most once
+        count = len(frame)
+        done = 0
+        while done < count:
+            run = min(count - done, self.capacity - self._next)
+            for name, array in [('timestamp', self._timestamps)] + list(self._columns.items()):
+                chunk = values[name][done:done + run]
+                array[self._next:self._next + run] = chunk
+                array[self._next + self.capacity:self._next + self.capacity + run] = chunk
+            done += run
+            self._next = (self._next + run) % self.capacity
+        self._length = min(self._length + count, self.capacity)
+
+    def column(self, name):
+        """Get a read-only view of one column ('open', ..., 'volume'), oldest bar first"""
+        view = self._columns[name][self._window()]
+        view.flags.writeable = False
+        return view
+
+    def timestamps(self):
+        """Get a read-only view of the bar timestamps as int64 nanoseconds (UTC)"""
+        view = self._timestamps[self._window()]
+        view.flags.writeable = False
+        return view
+
+    @property
+    def last_timestamp(self):
+        """Timestamp of the newest bar in IST, or None if the ring is empty"""
+        if not self._length:
+            return None
+        return pd.Timestamp(self._timestamps[self._next - 1 + self.capacity], tz='UTC').tz_convert(IST)
+
+    def to_frame(self):
+        """Copy the bars into an OHLCV DataFrame indexed by IST timestamp"""
+        index = pd.DatetimeIndex(
+            pd.to_datetime(self.timestamps().copy(), utc=True).tz_convert(IST), name='timestamp'
+        )
+        return pd.DataFrame(
+            {name: self.column(name).copy() for name in OHLCV_COLUMNS}, index=index
+        )
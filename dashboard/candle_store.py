@@ -0,0 +1,227 @@
+import os
+import struct
+import threading
+import numpy as np
+import pandas as pd
+
+from .market_calendar import IST
+
+
+OHLCV_COLUMNS = ['open', 'high', 'low', 'close', 'volume']
+
+# Default location of the persisted candles, next to the other dashboard data files
+DEFAULT_STORE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'candles')
+
+MAGIC = b'CNDA'
+VERSION = 1
+
+# magic, version, flags, rows, capacity
+HEADER = struct.Struct('<4sHH8xqq')
+HEADER_SIZE = 64
+
+# Header flags
+TZ_AWARE = 1
+
+# Columns in file order: timestamps (int64 ns since the epoch, UTC), prices, volume
+COLUMN_DTYPES = [('timestamp', np.int64)] + [(name, np.float64) for name in OHLCV_COLUMNS[:-1]] + [('volume', np.int64)]
+
+# Smallest number of rows a file is laid out for; it doubles when full
+MIN_CAPACITY = 1024
+
+
+class CandleStore:
+    """Persistent columnar archive of OHLCV candles per symbol, exchange and interval
+
+    Each series is one binary file: a fixed header followed by one fixed-width
+    column per field (timestamps, open, high, low, close, volume), each with
+    room for capacity rows. Reads memory-map the file and slice the columns by
+    timestamp with a binary search, so months of 1min bars load without
+    parsing; reads copy the rows they return. New bars are written in place after the stored ones; the row
+    count in the header is updated last, so readers always see complete bars.
+    A file is rewritten (and atomically replaced) only when it is full or
+    older bars are backfilled.
+    """
+
+    def __init__(self, base_dir=None):
+        self.base_dir = base_dir or os.getenv('CANDLE_STORE_DIR', DEFAULT_STORE_DIR)
+        self._maps = {}
+        self._lock = threading.Lock()
+        # One writer at a time; readers never wait for it
+        self._write_lock = threading.Lock()
+
+    def _path(self, symbol, exchange, interval):
+        return os.path.join(self.base_dir, f"{exchange}_{symbol}_{interval}.candles")
+
+    def _map(self, symbol, exchange, interval):
+        """Get (flags, rows, columns) of a stored series, with columns mapped read-only, or None"""
+        path = self._path(symbol, exchange, interval)
+        if not os.path.exists(path):
+            return None
+
+        try:
+            stat = os.stat(path)
+            with self._lock:
+                entry = self._maps.get(path)
+            if entry is None or entry[0] != (stat.st_ino, stat.st_size):
+                buffer = np.memmap(path, dtype=np.uint8, mode='r')
+                magic, version, flags, _, capacity = HEADER.unpack_from(buffer)
+                if magic != MAGIC or version != VERSION:
+                    raise ValueError("not a candle archive file")
+                columns = {}
+                offset = HEADER_SIZE
+                for name, dtype in COLUMN_DTYPES:
+                    columns[name] = buffer[offset:offset + 8 * capacity].view(dtype)
+                    offset += 8 * capacity
+                entry = ((stat.st_ino, stat.st_size), buffer, flags, columns)
+                with self._lock:
+                    self._maps[path] = entry
+        except Exception as e:
+            print(f"Error reading candle store file {path}: {str(e)}")
+            return None
+
+        _, buffer, flags, columns = entry
+        # The row count is read on every access; it grows as bars are appended
+        rows = HEADER.unpack_from(buffer)[3]
+        return flags, rows, columns
+
+    def read(self, symbol, exchange, interval, start=None, end=None):
+        """Get stored candles with start <= timestamp <= end, indexed by timestamp, or None if nothing is stored
+
+        Only the requested rows are copied out of the mapped file, so the
+        frame does not change when later merges rewrite the newest bars.
+        """
+        mapped = self._map(symbol, exchange, interval)
+        if mapped is None:
+            return None
+        flags, rows, columns = mapped
+
+        timestamps = columns['timestamp'][:rows]
+        first, last = 0, rows
+        if start is not None:
+            first = np.searchsorted(timestamps, self._nanoseconds(start, flags), side='left')
+        if end is not None:
+            last = np.searchsorted(timestamps, self._nanoseconds(end, flags), side='right')
+
+        index = pd.to_datetime(timestamps[first:last], utc=True)
+        index = index.tz_convert(IST) if flags & TZ_AWARE else index.tz_localize(None)
+        return pd.DataFrame(
+            {name: columns[name][first:last] for name in OHLCV_COLUMNS},
+            index=pd.DatetimeIndex(index, name='timestamp'),
+            copy=True,
+        )
+
+    def bounds(self, symbol, exchange, interval):
+        """Get the (first, last) stored timestamps of a series, or None if nothing is stored
+
+        Read straight from the mapped timestamp column; no rows are copied.
+        """
+        mapped = self._map(symbol, exchange, interval)
+        if mapped is None or not mapped[1]:
+            return None
+        flags, rows, columns = mapped
+        timestamps = columns['timestamp']
+        return self._timestamp(timestamps[0], flags), self._timestamp(timestamps[rows - 1], flags)
+
+    @staticmethod
+    def _timestamp(nanoseconds, flags):
+        timestamp = pd.Timestamp(int(nanoseconds), tz='UTC')
+        return timestamp.tz_convert(IST) if flags & TZ_AWARE else timestamp.tz_localize(None)
+
+    @staticmethod
+    def _nanoseconds(timestamp, flags):
+        timestamp = pd.Timestamp(timestamp)
+        if flags & TZ_AWARE and timestamp.tzinfo is None:
+            timestamp = timestamp.tz_localize(IST)
+        elif not flags & TZ_AWARE and timestamp.tzinfo is not None:
+            timestamp = timestamp.tz_localize(None)
+        return timestamp.as_unit('ns').value
+
+    def merge(self, symbol, exchange, interval, new_data):
+        """Merge freshly fetched candles into the store, de-duplicating on timestamp
+
+        Newer rows replace stored rows with the same timestamp, since the last
+        stored bar may have still been forming when it was fetched. Read the
+        merged rows back with read().
+        """
+        new_data = new_data[OHLCV_COLUMNS].sort_index()
+        new_data = new_data[~new_data.index.duplicated(keep='last')]
+        if new_data.empty:
+            return
+
+        with self._write_lock:
+            mapped = self._map(symbol, exchange, interval)
+            try:
+                if mapped is None:
+                    self._write(symbol, exchange, interval, new_data)
+                else:
+                    self._append(symbol, exchange, interval, mapped, new_data)
+            except Exception as e:
+                print(f"Error writing candle store for {symbol}: {str(e)}")
+
+    def _append(self, symbol, exchange, interval, mapped, new_data):
+        flags, rows, columns = mapped
+        capacity = len(columns['timestamp'])
+
+        # Keep the stored series' timezone handling
+        if flags & TZ_AWARE:
+            new_data = new_data.tz_localize(IST) if new_data.index.tz is None else new_data.tz_convert(IST)
+        elif not flags & TZ_AWARE and new_data.index.tz is not None:
+            new_data = new_data.tz_convert(IST).tz_localize(None)
+
+        timestamps = columns['timestamp'][:rows]
+        new_timestamps = self._index_nanoseconds(new_data.index)
+
+        # Rows from the first fetched timestamp on are replaced by the fetched ones
+        position = int(np.searchsorted(timestamps, new_timestamps[0], side='left'))
+        if rows and (new_timestamps[0] < timestamps[0] or new_timestamps[-1] < timestamps[-1]
+                     or position + len(new_data) > capacity):
+            # Bars before or between stored ones, or a full file: rewrite the merged series
+            stored = self.read(symbol, exchange, interval)
+            df = pd.concat([stored, new_data])
+            df = df[~df.index.duplicated(keep='last')].sort_index()
+            self._write(symbol, exchange, interval, df)
+            return
+
+        path = self._path(symbol, exchange, interval)
+        with open(path, 'r+b') as f:
+            offset = HEADER_SIZE
+            for name, dtype in COLUMN_DTYPES:
+                values = new_timestamps if name == 'timestamp' else self._values(new_data, name)
+                f.seek(offset + 8 * position)
+                f.write(np.ascontiguousarray(values, dtype=dtype).tobytes())
+                offset += 8 * capacity
+            # Publish the new bars only once they are all written
+            f.seek(0)
+            f.write(HEADER.pack(MAGIC, VERSION, flags, position + len(new_data), capacity))
+
+    def _write(self, symbol, exchange, interval, df):
+        """Write a whole series to a new file and move it into place"""
+        flags = TZ_AWARE if df.index.tz is not None else 0
+        rows = len(df)
+        capacity = max(MIN_CAPACITY, 2 * rows)
+        timestamps = self._index_nanoseconds(df.index)
+
+        path = self._path(symbol, exchange, interval)
+        temp_path = f"{path}.{os.getpid()}.tmp"
+        os.makedirs(self.base_dir, exist_ok=True)
+        with open(temp_path, 'wb') as f:
+            f.write(HEADER.pack(MAGIC, VERSION, flags, rows, capacity).ljust(HEADER_SIZE, b'\0'))
+            for name, dtype in COLUMN_DTYPES:
+                values = timestamps if name == 'timestamp' else self._values(df, name)
+                column = np.zeros(capacity, dtype=dtype)
+                column[:rows] = values
+                f.write(column.tobytes())
+        os.replace(temp_path, path)
+
+    @staticmethod
+    def _values(df, name):
+        # Volume is stored as integers, so a missing volume is stored as 0
+        return df[name].fillna(0).to_numpy() if name == 'volume' else df[name].to_numpy()
+
+    @staticmethod
+    def _index_nanoseconds(index):
+        return pd.DatetimeIndex(index).as_unit('ns').asi8
+
+
+# Store shared by every fetch in this process
+candle_store = CandleStore()
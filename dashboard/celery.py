@@ -1,8 +1,47 @@
 from celery import Celery
+from celery.signals import worker_ready
+from .models import Alert
+from .instruments import instrument_index
 from .services import check_alerts
+from .scheduler import evaluation_scheduler
 
 app = Celery('trading_alerts')
 
+# Polled every minute; the task itself skips runs when no new bar has closed
+app.conf.beat_schedule = {
+    'run-alert-checks': {
+        'task': 'dashboard.celery.run_alert_checks',
+        'schedule': 60.0,
+    },
+    # Downloads the instrument master once a day; later runs only reload it
+    'update-instruments': {
+        'task': 'dashboard.celery.update_instruments',
+        'schedule': 3600.0,
+    },
+}
+
+@worker_ready.connect
+def load_instruments(**kwargs):
+    # Token lookups never download, so have the master in place before any task runs
+    instrument_index.update()
+
+@app.task
+def update_instruments():
+    instrument_index.update()
+
 @app.task
 def run_alert_checks():
-    check_alerts()
+    timeframes = Alert.objects.filter(is_active=True).values_list('timeframe', flat=True).distinct()
+    due = evaluation_scheduler.due_timeframes(timeframes)
+    lagging = evaluation_scheduler.lagging_series()
+    if not due and not lagging:
+        return
+
+    # Only alerts whose bar just closed are evaluated
+    skipped = check_alerts(due, lagging)
+
+    for timeframe, closes in due.items():
+        evaluation_scheduler.mark_evaluated(timeframe, closes[-1])
+
+    # Series skipped for stale or missing candles are caught up on in a later run
+    evaluation_scheduler.set_lagging(skipped)
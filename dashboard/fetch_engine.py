@@ -0,0 +1,53 @@
+import os
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+
+class FetchEngine:
+    """Fetches many (symbol, timeframe) series concurrently
+
+    Concurrency is bounded by max_workers; the broker rate limit is still
+    enforced by the shared limiter inside AngelOneAPI, so workers simply wait
+    for tokens instead of overrunning it.
+    """
+
+    def __init__(self, max_workers=None):
+        self.max_workers = max_workers or int(os.getenv('FETCH_MAX_WORKERS', '8'))
+
+    def fetch_all(self, requests, fetch=None):
+        """Fetch every requested series, yielding results as they complete
+
+        Parameters:
+        requests (iterable): (symbol, timeframe) pairs; duplicates are fetched once
+        fetch (callable): fetch(symbol, timeframe) returning a DataFrame or None,
+                          defaults to dashboard.utils.get_historical_data
+
+        Yields:
+        tuple: (symbol, timeframe, DataFrame or None) in completion order
+        """
+        if fetch is None:
+            from .utils import get_historical_data
+            fetch = get_historical_data
+
+        unique_requests = list(dict.fromkeys(requests))
+        if not unique_requests:
+            return
+
+        workers = min(self.max_workers, len(unique_requests))
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = {
+                executor.submit(fetch, symbol, timeframe): (symbol, timeframe)
+                for symbol, timeframe in unique_requests
+            }
+
+            for future in as_completed(futures):
+                symbol, timeframe = futures[future]
+                try:
+                    df = future.result()
+                except Exception as e:
+                    print(f"Error fetching {symbol} ({timeframe}): {str(e)}")
+                    df = None
+                yield symbol, timeframe, df
+
+
+# Engine shared by the alert checks in this process
+fetch_engine = FetchEngine()
@@ -1,5 +1,6 @@
 from django import forms
 from .models import Alert, StockGroup, Stock, Indicator, UserNotificationPreferences
+from .indicators import INDICATORS, get_indicator
 import json
 
 class StockGroupForm(forms.ModelForm):
@@ -73,6 +74,10 @@ class AlertForm(forms.ModelForm):
             # Filter stock_group choices to only show the user's groups
             self.fields['stock_group'].queryset = StockGroup.objects.filter(user=user)
             
+        # Only offer indicators the evaluation engine implements
+        for field in ('indicator1', 'indicator2'):
+            self.fields[field].queryset = Indicator.objects.filter(name__in=list(INDICATORS))
+            
         # If we're editing an existing alert, populate the period fields
         if self.instance and self.instance.pk:
             try:
@@ -94,17 +99,14 @@ class AlertForm(forms.ModelForm):
         stock = cleaned_data.get('stock')
         stock_group = cleaned_data.get('stock_group')
         
-        # Convert simple period inputs to JSON params
-        period1 = cleaned_data.get('period1')
-        period2 = cleaned_data.get('period2')
-        
-        # Create JSON for indicator1
-        indicator1_params = json.dumps({"period": period1})
-        cleaned_data['indicator1_params'] = indicator1_params
-        
-        # Create JSON for indicator2
-        indicator2_params = json.dumps({"period": period2})
-        cleaned_data['indicator2_params'] = indicator2_params
+        # Convert simple period inputs to JSON params, for indicators that take a period
+        for number in ('1', '2'):
+            indicator = cleaned_data.get(f'indicator{number}')
+            spec = get_indicator(indicator.name) if indicator else None
+            params = {}
+            if spec and spec.has_param('period'):
+                params['period'] = cleaned_data.get(f'period{number}')
+            cleaned_data[f'indicator{number}_params'] = json.dumps(params)
         
         if alert_type == 'single' and not stock:
             self.add_error('stock', 'This field is required for single stock alerts.')
@@ -0,0 +1,354 @@
+import math
+import threading
+from collections import deque
+import numpy as np
+
+
+# Incremental counterparts of calculate_sma, calculate_ema, calculate_rsi and
+# calculate_macd in kernels. Each update is O(1) and reproduces the pandas
+# rolling/ewm arithmetic step by step, so the value after feeding a series is
+# bit-for-bit the last value of the batch calculation over that series.
+
+
+class RollingMeanState:
+    """Running mean over a fixed window, as Series.rolling(window).mean()
+
+    Follows pandas' online algorithm: Kahan-compensated sums for the values
+    entering and leaving the window, with its clamping of results whose sign
+    cannot be right and its exact result for runs of identical values.
+    """
+
+    kind = 'rolling_mean'
+
+    def __init__(self, window):
+        self.window = window
+        self.values = deque()
+        self.nobs = 0
+        self.neg_ct = 0
+        self.sum_x = 0.0
+        self.compensation_add = 0.0
+        self.compensation_remove = 0.0
+        self.num_consecutive_same_value = 0
+        self.prev_value = None
+        self.value = math.nan
+
+    def _add(self, val):
+        if val == val:
+            self.nobs += 1
+            y = val - self.compensation_add
+            t = self.sum_x + y
+            self.compensation_add = t - self.sum_x - y
+            self.sum_x = t
+            if math.copysign(1.0, val) < 0:
+                self.neg_ct += 1
+            if val == self.prev_value:
+                self.num_consecutive_same_value += 1
+            else:
+                self.num_consecutive_same_value = 1
+            self.prev_value = val
+
+    def _remove(self, val):
+        if val == val:
+            self.nobs -= 1
+            y = -val - self.compensation_remove
+            t = self.sum_x + y
+            self.compensation_remove = t - self.sum_x - y
+            self.sum_x = t
+            if math.copysign(1.0, val) < 0:
+                self.neg_ct -= 1
+
+    def update(self, val):
+        """Add the next value and return the mean of the window ending at it"""
+        val = float(val)
+        if self.prev_value is None:
+            self.prev_value = val
+        if len(self.values) == self.window:
+            self._remove(self.values.popleft())
+        self.values.append(val)
+        self._add(val)
+
+        if self.nobs >= self.window and self.nobs > 0:
+            result = self.sum_x / self.nobs
+            if self.num_consecutive_same_value >= self.nobs:
+                result = self.prev_value
+            elif self.neg_ct == 0 and result < 0:
+                result = 0.0
+            elif self.neg_ct == self.nobs and result > 0:
+                result = 0.0
+        else:
+            result = math.nan
+
+        self.value = result
+        return result
+
+    def to_dict(self):
+        return {
+            'kind': self.kind,
+            'window': self.window,
+            'values': list(self.values),
+            'nobs': self.nobs,
+            'neg_ct': self.neg_ct,
+            'sum_x': self.sum_x,
+            'compensation_add': self.compensation_add,
+            'compensation_remove': self.compensation_remove,
+            'num_consecutive_same_value': self.num_consecutive_same_value,
+            'prev_value': self.prev_value,
+            'value': self.value,
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        state = cls(data['window'])
+        for name, value in data.items():
+            if name not in ('kind', 'window', 'values'):
+                setattr(state, name, value)
+        state.values = deque(data['values'])
+        return state
+
+
+class SMAState(RollingMeanState):
+    """Simple Moving Average of closes, as calculate_sma"""
+
+    kind = 'sma'
+
+
+class EMAState:
+    """Exponential Moving Average, as calculate_ema (ewm(span, adjust=False).mean())"""
+
+    kind = 'ema'
+
+    def __init__(self, period):
+        self.period = period
+        com = (period - 1) / 2.0
+        self.alpha = 1.0 / (1.0 + com)
+        self.nobs = 0
+        self.weighted = math.nan
+        self.value = math.nan
+
+    def update(self, val):
+        """Add the next value and return the updated average"""
+        val = float(val)
+        is_observation = val == val
+
+        if self.nobs == 0 and self.weighted != self.weighted:
+            # First value seeds the average
+            self.weighted = val
+        elif self.weighted == self.weighted:
+            if is_observation:
+                old_wt = 1.0 - self.alpha
+                if self.weighted != val:
+                    self.weighted = (old_wt * self.weighted + self.alpha * val) / (old_wt + self.alpha)
+        elif is_observation:
+            self.weighted = val
+
+        self.nobs += is_observation
+        self.value = self.weighted if self.nobs >= 1 else math.nan
+        return self.value
+
+    def to_dict(self):
+        return {'kind': self.kind, 'period': self.period, 'nobs': self.nobs, 'weighted': self.weighted}
+
+    @classmethod
+    def from_dict(cls, data):
+        state = cls(data['period'])
+        state.nobs = data['nobs']
+        state.weighted = data['weighted']
+        state.value = state.weighted if state.nobs >= 1 else math.nan
+        return state
+
+
+class RSIState:
+    """Relative Strength Index over simple averages of gains and losses, as calculate_rsi"""
+
+    kind = 'rsi'
+
+    def __init__(self, period=14):
+        self.period = period
+        self.gains = RollingMeanState(period)
+        self.losses = RollingMeanState(period)
+        self.prev_close = None
+        self.value = math.nan
+
+    def update(self, close):
+        """Add the next close and return the updated RSI"""
+        close = float(close)
+        delta = close - self.prev_close if self.prev_close is not None else math.nan
+        self.prev_close = close
+
+        # Same arithmetic as delta.where(delta > 0, 0) and -delta.where(delta < 0, 0),
+        # including the negative zero the latter yields
+        gain = delta if delta > 0 else 0.0
+        loss = -(delta if delta < 0 else 0.0)
+
+        avg_gain = np.float64(self.gains.update(gain))
+        avg_loss = np.float64(self.losses.update(loss))
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            rs = avg_gain / avg_loss
+            self.value = float(100 - (100 / (1 + rs)))
+        return self.value
+
+    def to_dict(self):
+        return {
+            'kind': self.kind,
+            'period': self.period,
+            'gains': self.gains.to_dict(),
+            'losses': self.losses.to_dict(),
+            'prev_close': self.prev_close,
+            'value': self.value,
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        state = cls(data['period'])
+        state.gains = RollingMeanState.from_dict(data['gains'])
+        state.losses = RollingMeanState.from_dict(data['losses'])
+        state.prev_close = data['prev_close']
+        state.value = data['value']
+        return state
+
+
+class MACDState:
+    """MACD line, signal line and histogram, as calculate_macd
+
+    value is the MACD line, which is what alerts compare against.
+    """
+
+    kind = 'macd'
+
+    def __init__(self, fast_period=12, slow_period=26, signal_period=9):
+        self.fast = EMAState(fast_period)
+        self.slow = EMAState(slow_period)
+        self.signal = EMAState(signal_period)
+        self.macd_line = math.nan
+        self.histogram = math.nan
+        self.value = math.nan
+
+    def update(self, close):
+        """Add the next close and return the updated MACD line"""
+        self.macd_line = self.fast.update(close) - self.slow.update(close)
+        signal_line = self.signal.update(self.macd_line)
+        self.histogram = self.macd_line - signal_line
+        self.value = self.macd_line
+        return self.value
+
+    def to_dict(self):
+        return {
+            'kind': self.kind,
+            'fast': self.fast.to_dict(),
+            'slow': self.slow.to_dict(),
+            'signal': self.signal.to_dict(),
+            'macd_line': self.macd_line,
+            'histogram': self.histogram,
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        state = cls()
+        state.fast = EMAState.from_dict(data['fast'])
+        state.slow = EMAState.from_dict(data['slow'])
+        state.signal = EMAState.from_dict(data['signal'])
+        state.macd_line = data['macd_line']
+        state.histogram = data['histogram']
+        state.value = state.macd_line
+        return state
+
+
+STATE_KINDS = {cls.kind: cls for cls in (RollingMeanState, SMAState, EMAState, RSIState, MACDState)}
+
+
+def create_state(indicator):
+    """Create an empty incremental state for a compiled indicator, or None if unsupported"""
+    if indicator.spec is None or indicator.spec.state is None:
+        return None
+    return indicator.spec.state(*[value for _, value in indicator.params])
+
+
+def state_from_dict(data):
+    """Rebuild a state serialized with to_dict()"""
+    return STATE_KINDS[data['kind']].from_dict(data)
+
+
+class IndicatorStates:
+    """Incremental indicator states per (symbol, timeframe, indicator), fed one closed bar at a time
+
+    evaluate(plan, symbol, bars) works like AlertPlan.evaluate on the closed
+    bars of a series held in a CandleRing, reading its column views without
+    building a DataFrame. A state advances over the bars that are newer than
+    the last bar it saw; if the ring no longer reaches back to that bar, the
+    state is rebuilt from the ring. Values equal the batch calculation over
+    every bar since the state was built, which can be more history than the
+    ring itself holds: EMA-based values then differ from a batch over the
+    ring alone, and rolling means can differ from it in the last bit.
+    """
+
+    def __init__(self):
+        self._states = {}
+        self._lock = threading.Lock()
+
+    def value(self, symbol, timeframe, bars, indicator):
+        """Get the latest value of a compiled indicator on a series' ring of closed bars"""
+        if bars is None or not len(bars):
+            return None
+
+        key = (symbol, timeframe, indicator.key)
+        with self._lock:
+            entry = self._states.get(key)
+
+        # Bar timestamps as int64 nanoseconds (UTC)
+        timestamps = bars.timestamps()
+        last = int(timestamps[-1])
+        if entry is not None and entry[1] == last:
+            return entry[0].value
+
+        closes = bars.column('close')
+        if entry is not None and timestamps[0] <= entry[1] < last:
+            state, seen = entry
+            closes = closes[np.searchsorted(timestamps, seen, side='right'):]
+        else:
+            state = create_state(indicator)
+            if state is None:
+                import pandas as pd
+                return indicator.latest(pd.Series(closes, dtype=float))
+
+        for close in closes.astype(float):
+            state.update(close)
+
+        with self._lock:
+            self._states[key] = (state, last)
+        return state.value
+
+    def evaluate(self, plan, symbol, bars):
+        """Evaluate a compiled alert plan on a series' ring of closed bars
+
+        Returns:
+        tuple: (is_triggered, indicator1_value, indicator2_value)
+        """
+        indicator1_value = self.value(symbol, plan.timeframe, bars, plan.indicator1)
+        indicator2_value = self.value(symbol, plan.timeframe, bars, plan.indicator2)
+        return plan.is_triggered(indicator1_value, indicator2_value), indicator1_value, indicator2_value
+
+    def dump(self):
+        """Serialize every state, e.g. to keep it in the Django cache between runs"""
+        import pandas as pd
+
+        with self._lock:
+            return [
+                {'key': [symbol, timeframe, name, [list(param) for param in params]],
+                 'timestamp': pd.Timestamp(timestamp, tz='UTC').isoformat(), 'state': state.to_dict()}
+                for (symbol, timeframe, (name, params)), (state, timestamp) in self._states.items()
+            ]
+
+    def load(self, data):
+        """Restore states serialized with dump()"""
+        import pandas as pd
+
+        with self._lock:
+            for entry in data or []:
+                symbol, timeframe, name, params = entry['key']
+                key = (symbol, timeframe, (name, tuple(tuple(param) for param in params)))
+                self._states[key] = (state_from_dict(entry['state']), pd.Timestamp(entry['timestamp']).value)
+
+
+# States advanced by the streaming engine as bars close
+indicator_states = IndicatorStates()
@@ -0,0 +1,100 @@
+import re
+import threading
+import pandas as pd
+import ta  # Technical analysis library for indicators
+
+from .indicators import get_indicator
+
+
+def _registry_columns(indicator, columns, *params):
+    """Get a function computing columns from the outputs of a registered indicator's kernel
+
+    The columns use the same kernels as alerts, so e.g. frame['rsi'] equals
+    an RSI(14) alert's value.
+    """
+    kernel = get_indicator(indicator).kernel
+
+    def compute(df):
+        result = kernel(df['close'], *params)
+        if not isinstance(result, tuple):
+            result = (result,)
+        return dict(zip(columns, result))
+    return compute
+
+
+_rsi = _registry_columns('RSI', ('rsi',), 14)
+_macd = _registry_columns('MACD', ('macd', 'macd_signal', 'macd_histogram'), 12, 26, 9)
+_bollinger = _registry_columns('Bollinger Middle', ('bollinger_high', 'bollinger_mid', 'bollinger_low'), 20, 2)
+
+
+def _atr(df):
+    # Uses high and low as well, so it is not one of the close-based registry indicators
+    return {'atr': ta.volatility.AverageTrueRange(df['high'], df['low'], df['close']).average_true_range()}
+
+
+# Indicator columns and the function computing them; columns calculated
+# together (e.g. the three MACD series) share one function
+INDICATOR_COLUMNS = {
+    'rsi': _rsi,
+    'macd': _macd,
+    'macd_signal': _macd,
+    'macd_histogram': _macd,
+    'bollinger_high': _bollinger,
+    'bollinger_low': _bollinger,
+    'bollinger_mid': _bollinger,
+    'atr': _atr,
+}
+
+# Columns materialized by default, matching what add_indicators used to add
+DEFAULT_COLUMNS = list(INDICATOR_COLUMNS) + ['sma_20', 'sma_50', 'sma_200']
+
+# Moving averages of any window, e.g. sma_20 or ema_9
+MOVING_AVERAGE_COLUMN = re.compile(r'^(sma|ema)_(\d+)$')
+
+# Frames are shared through the candle cache, so columns are added under a lock
+_lock = threading.RLock()
+
+
+def _moving_average(kind, window):
+    return _registry_columns(kind.upper(), (f"{kind}_{window}",), window)
+
+
+def indicator_column(name):
+    """Get the function computing an indicator column, or None if it is not one"""
+    if name in INDICATOR_COLUMNS:
+        return INDICATOR_COLUMNS[name]
+    match = MOVING_AVERAGE_COLUMN.match(name)
+    if match:
+        return _moving_average(match.group(1), int(match.group(2)))
+    return None
+
+
+class IndicatorFrame(pd.DataFrame):
+    """OHLCV DataFrame whose indicator columns are computed on first access
+
+    frame['rsi'] calculates RSI over the frame, stores it as a column and
+    returns it; later reads use the stored column. Columns that are never
+    read are never calculated. Row-wise access (frame.iloc[-1], to_csv)
+    only sees columns already computed, so call materialize() first.
+    """
+
+    @property
+    def _constructor(self):
+        return IndicatorFrame
+
+    def __getitem__(self, key):
+        if isinstance(key, str) and key not in self.columns:
+            compute = indicator_column(key)
+            if compute is not None:
+                with _lock:
+                    if key not in self.columns:
+                        for name, values in compute(self).items():
+                            if name not in self.columns:
+                                self[name] = values
+        return super().__getitem__(key)
+
+    def materialize(self, *columns):
+        """Compute the given indicator columns (by default all of them) and return the frame"""
+        for column in columns or DEFAULT_COLUMNS:
+            self[column]
+        return self
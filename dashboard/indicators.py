@@ -0,0 +1,148 @@
+from dataclasses import dataclass
+
+from .kernels import calculate_sma, calculate_ema, calculate_rsi, calculate_macd, calculate_bollinger_bands
+from . import vector_engine
+from .incremental import SMAState, EMAState, RSIState, MACDState
+
+
+@dataclass(frozen=True)
+class Parameter:
+    """A declared indicator parameter with its default and accepted range"""
+
+    name: str
+    default: int
+    min_value: int = 1
+    max_value: int = 500
+
+
+@dataclass(frozen=True)
+class IndicatorSpec:
+    """One indicator: its kernels, parameters, outputs and warm-up length
+
+    kernel(close, *params) is the pandas implementation and returns a Series,
+    or a tuple of Series named by outputs; alerts compare against output.
+    vector_kernel(closes, *params) computes output over a symbols x bars
+    array, and state(*params) creates an incremental state, where available.
+    warmup(params) is the number of bars needed before the value settles.
+    """
+
+    name: str
+    kernel: object
+    params: tuple = ()
+    outputs: tuple = ('value',)
+    output: str = 'value'
+    warmup: object = None
+    vector_kernel: object = None
+    state: object = None
+
+    @property
+    def param_names(self):
+        return [param.name for param in self.params]
+
+    def has_param(self, name):
+        return name in self.param_names
+
+    def canonical_params(self, raw):
+        """Get (name, value) pairs for every declared parameter, in kernel argument order
+
+        Missing or invalid values fall back to the default; values are kept
+        within the declared range.
+        """
+        params = []
+        for param in self.params:
+            try:
+                value = int(raw.get(param.name, param.default))
+            except (TypeError, ValueError):
+                value = param.default
+            params.append((param.name, min(max(value, param.min_value), param.max_value)))
+        return tuple(params)
+
+    def warmup_bars(self, params):
+        return self.warmup(dict(params)) if self.warmup else 0
+
+    def compute(self, close, params):
+        """Calculate the compared output over a close Series"""
+        result = self.kernel(close, *[value for _, value in params])
+        if isinstance(result, tuple):
+            result = result[self.outputs.index(self.output)]
+        return result
+
+
+INDICATORS = {}
+
+
+def register(spec):
+    """Add an indicator to the registry"""
+    INDICATORS[spec.name] = spec
+    return spec
+
+
+def get_indicator(name):
+    """Get a registered indicator by name, or None"""
+    return INDICATORS.get(name)
+
+
+PERIOD = Parameter('period', 14)
+
+register(IndicatorSpec(
+    name='SMA',
+    kernel=calculate_sma,
+    params=(PERIOD,),
+    warmup=lambda p: p['period'],
+    vector_kernel=vector_engine.rolling_mean,
+    state=SMAState,
+))
+
+register(IndicatorSpec(
+    name='EMA',
+    kernel=calculate_ema,
+    params=(PERIOD,),
+    # Long enough for the seed value's weight to become negligible
+    warmup=lambda p: 4 * p['period'],
+    vector_kernel=vector_engine.ewm_mean,
+    state=EMAState,
+))
+
+register(IndicatorSpec(
+    name='RSI',
+    kernel=calculate_rsi,
+    params=(PERIOD,),
+    warmup=lambda p: p['period'] + 1,
+    vector_kernel=vector_engine.rsi,
+    state=RSIState,
+))
+
+register(IndicatorSpec(
+    name='MACD',
+    kernel=calculate_macd,
+    params=(
+        Parameter('fast_period', 12),
+        Parameter('slow_period', 26),
+        Parameter('signal_period', 9),
+    ),
+    outputs=('macd', 'signal', 'histogram'),
+    output='macd',
+    warmup=lambda p: 4 * p['slow_period'] + p['signal_period'],
+    vector_kernel=vector_engine.macd_line,
+    state=MACDState,
+))
+
+for _band, _output in (('Upper', 'upper'), ('Middle', 'middle'), ('Lower', 'lower')):
+    register(IndicatorSpec(
+        name=f'Bollinger {_band}',
+        kernel=calculate_bollinger_bands,
+        params=(Parameter('period', 20), Parameter('num_std', 2, max_value=10)),
+        outputs=('upper', 'middle', 'lower'),
+        output=_output,
+        warmup=lambda p: p['period'],
+        vector_kernel=vector_engine.bollinger_band(_output),
+    ))
+del _band, _output
+
+register(IndicatorSpec(
+    name='Price',
+    kernel=lambda close: close,
+    outputs=('close',),
+    output='close',
+    vector_kernel=vector_engine.price,
+))
@@ -0,0 +1,156 @@
+import os
+import json
+import threading
+from datetime import date, datetime
+import requests
+
+
+# Angel One publishes the full instrument master here every trading day
+SCRIP_MASTER_URL = "https://margincalculator.angelbroking.com/OpenAPI_File/files/OpenAPIScripMaster.json"
+
+# Compact copy of the master, keeping only what token lookups need
+DEFAULT_INSTRUMENTS_PATH = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), 'data', 'instruments.json'
+)
+
+
+class InstrumentIndex:
+    """In-memory symbol <-> token index built from the Angel One instrument master
+
+    The master is stored compactly as {exchange: {trading_symbol: token}}.
+    Lookups are plain dict accesses and never download: update() fetches
+    the master at most once per day, at worker startup and from beat, and
+    every process reloads the compact file when it changes. NSE equities can
+    be looked up either by trading symbol ('RELIANCE-EQ') or by bare symbol
+    ('RELIANCE').
+    """
+
+    def __init__(self, path=None, url=SCRIP_MASTER_URL):
+        self.path = path or os.getenv('INSTRUMENTS_PATH', DEFAULT_INSTRUMENTS_PATH)
+        self.url = url
+        self._mtime = None
+        self._tokens = {}
+        self._symbols = {}
+        self._lock = threading.Lock()
+
+    def refresh(self, source=None):
+        """Rebuild the compact instrument file from the master and load it
+
+        Parameters:
+        source (str): Path to a local copy of the master, or None to download it
+
+        Returns:
+        int: Number of instruments indexed
+        """
+        if source:
+            with open(source) as f:
+                master = json.load(f)
+        else:
+            response = requests.get(self.url, timeout=60)
+            response.raise_for_status()
+            master = response.json()
+
+        compact = {}
+        for instrument in master:
+            exchange = instrument.get('exch_seg')
+            symbol = instrument.get('symbol')
+            token = instrument.get('token')
+            if exchange and symbol and token:
+                compact.setdefault(exchange, {})[symbol] = str(token)
+
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        temp_path = f"{self.path}.{os.getpid()}.tmp"
+        with open(temp_path, 'w') as f:
+            json.dump(compact, f, separators=(',', ':'))
+        os.replace(temp_path, self.path)
+
+        with self._lock:
+            self._build(compact)
+            self._mtime = os.path.getmtime(self.path)
+        return sum(len(symbols) for symbols in compact.values())
+
+    def is_current(self):
+        """Check whether the compact file was built from today's master"""
+        return (
+            os.path.exists(self.path)
+            and datetime.fromtimestamp(os.path.getmtime(self.path)).date() >= date.today()
+        )
+
+    def update(self):
+        """Download the master if the compact file is from a previous day, then load it
+
+        Returns:
+        bool: True if an index is available
+        """
+        if not self.is_current():
+            try:
+                count = self.refresh()
+                print(f"Downloaded instrument master with {count} instruments")
+            except Exception as e:
+                # Keep serving the previous day's index if there is one
+                print(f"Error downloading instrument master: {str(e)}")
+        return self.load()
+
+    def load(self):
+        """Load the compact file if it changed since it was last loaded
+
+        Returns:
+        bool: True if an index is available
+        """
+        try:
+            mtime = os.path.getmtime(self.path)
+        except OSError:
+            return bool(self._tokens)
+
+        if mtime != self._mtime:
+            with self._lock:
+                if mtime != self._mtime:
+                    try:
+                        with open(self.path) as f:
+                            self._build(json.load(f))
+                    except Exception as e:
+                        print(f"Error reading {self.path}: {str(e)}")
+                    self._mtime = mtime
+
+        return bool(self._tokens)
+
+    def _build(self, compact):
+        tokens = {}
+        symbols = {}
+        for exchange, instruments in compact.items():
+            by_symbol = dict(instruments)
+            by_token = {token: symbol for symbol, token in instruments.items()}
+
+            # Allow bare equity symbols, e.g. 'RELIANCE' for 'RELIANCE-EQ'
+            for symbol, token in instruments.items():
+                if symbol.endswith('-EQ'):
+                    by_symbol.setdefault(symbol[:-3], token)
+
+            tokens[exchange] = by_symbol
+            symbols[exchange] = by_token
+
+        self._tokens = tokens
+        self._symbols = symbols
+
+    def token(self, symbol, exchange='NSE'):
+        """Get the symbol token for a trading symbol, or None if it is unknown"""
+        self.load()
+        return self._tokens.get(exchange, {}).get(symbol)
+
+    def symbol(self, token, exchange='NSE'):
+        """Get the trading symbol for a symbol token, or None if it is unknown"""
+        self.load()
+        return self._symbols.get(exchange, {}).get(str(token))
+
+
+# Index shared by every fetch path in this process
+instrument_index = InstrumentIndex()
+
+
+def resolve_token(symbol, exchange='NSE'):
+    """Resolve a trading symbol to its Angel One symbol token
+
+    Returns None when the master does not list it, or when no master has
+    been loaded yet (run the load_instruments command or start a worker).
+    """
+    return instrument_index.token(symbol, exchange)
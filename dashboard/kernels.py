@@ -0,0 +1,46 @@
+# Indicator calculation functions, kept free of Django and provider imports
+# so the indicator registry can be loaded by the standalone test scripts
+
+
+def calculate_sma(data, period):
+    """Calculate Simple Moving Average"""
+    return data.rolling(window=period).mean()
+
+def calculate_ema(data, period):
+    """Calculate Exponential Moving Average"""
+    return data.ewm(span=period, adjust=False).mean()
+
+def calculate_rsi(data, period=14):
+    """Calculate Relative Strength Index"""
+    # Calculate price changes
+    delta = data.diff()
+    
+    # Separate gains and losses
+    gain = delta.where(delta > 0, 0)
+    loss = -delta.where(delta < 0, 0)
+    
+    # Calculate average gain and loss
+    avg_gain = gain.rolling(window=period).mean()
+    avg_loss = loss.rolling(window=period).mean()
+    
+    # Calculate RS
+    rs = avg_gain / avg_loss
+    
+    # Calculate RSI
+    rsi = 100 - (100 / (1 + rs))
+    return rsi
+
+def calculate_macd(data, fast_period=12, slow_period=26, signal_period=9):
+    """Calculate MACD (Moving Average Convergence Divergence)"""
+    ema_fast = calculate_ema(data, fast_period)
+    ema_slow = calculate_ema(data, slow_period)
+    macd_line = ema_fast - ema_slow
+    signal_line = calculate_ema(macd_line, signal_period)
+    histogram = macd_line - signal_line
+    return macd_line, signal_line, histogram
+
+def calculate_bollinger_bands(data, period=20, num_std=2):
+    """Calculate Bollinger Bands (upper, middle, lower) around a simple moving average"""
+    middle = calculate_sma(data, period)
+    std = data.rolling(window=period).std(ddof=0)
+    return middle + num_std * std, middle, middle - num_std * std
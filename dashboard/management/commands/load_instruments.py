@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand, CommandError
+from dashboard.instruments import instrument_index
+
+
+class Command(BaseCommand):
+    help = "Download (or load from a local file) the Angel One instrument master and rebuild the token index"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--file',
+            help="Path to a local copy of OpenAPIScripMaster.json instead of downloading it",
+        )
+
+    def handle(self, *args, **options):
+        try:
+            count = instrument_index.refresh(options.get('file'))
+        except Exception as e:
+            raise CommandError(f"Failed to load instrument master: {str(e)}")
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Indexed {count} instruments into {instrument_index.path}"
+        ))
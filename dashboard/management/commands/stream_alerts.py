@@ -0,0 +1,74 @@
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+from dashboard.alert_index import alert_index
+from dashboard.incremental import indicator_states
+from dashboard.instruments import instrument_index
+from dashboard.models import Alert
+from dashboard.services import check_series_alerts, history_bars
+from dashboard.streaming import BarBuilder, TickStream, ReplayWebSocket
+from dashboard.utils import get_historical_data
+
+
+STATES_CACHE_KEY = 'stream_alerts:indicator_states'
+
+
+class Command(BaseCommand):
+    help = "Stream ticks for every symbol referenced by active alerts and evaluate alerts on bar close"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--replay',
+            help="JSON-lines file of recorded websocket ticks to replay instead of connecting to Angel One",
+        )
+        parser.add_argument(
+            '--speed', type=float, default=0,
+            help="Replay speed multiplier (0 replays as fast as possible)",
+        )
+        parser.add_argument(
+            '--no-seed', action='store_true',
+            help="Do not seed bars with historical candles before streaming",
+        )
+
+    def handle(self, *args, **options):
+        # Every (symbol, timeframe) some active alert watches
+        series = alert_index.series()
+        if not series:
+            self.stdout.write("No active alerts to stream for.")
+            return
+
+        # Candles are fetched and ticks subscribed by symbol token
+        if not instrument_index.update():
+            self.stderr.write("No instrument master available; run load_instruments first.")
+            return
+
+        # Bars each series needs for the lookback of the alerts watching it
+        subscribers = {key: alert_index.alert_ids(*key) for key in series}
+        alerts = Alert.objects.filter(
+            pk__in=set().union(*subscribers.values()), is_active=True
+        ).select_related('indicator1', 'indicator2').in_bulk()
+        bars = history_bars(subscribers, alerts)
+
+        builder = BarBuilder(
+            timeframes=sorted({timeframe for _, timeframe in series}),
+            max_bars=max(500, *bars.values()),
+            on_bar_close=check_series_alerts,
+        )
+
+        # Seed each series with history so indicators have their lookback
+        if not options['no_seed']:
+            for symbol, timeframe in series:
+                builder.seed(symbol, timeframe, get_historical_data(symbol, timeframe, limit=bars[(symbol, timeframe)]))
+
+        # Resume indicator states saved by the previous run
+        indicator_states.load(cache.get(STATES_CACHE_KEY))
+        
+        websocket = ReplayWebSocket(options['replay'], options['speed']) if options['replay'] else None
+        stream = TickStream({(symbol, 'NSE') for symbol, _ in series}, builder, websocket)
+
+        self.stdout.write(f"Streaming {len(series)} series for {len(alert_index.symbols())} symbols...")
+        try:
+            stream.run(flush_interval=None if options['replay'] else 1.0)
+        except KeyboardInterrupt:
+            stream.close()
+        finally:
+            cache.set(STATES_CACHE_KEY, indicator_states.dump(), None)
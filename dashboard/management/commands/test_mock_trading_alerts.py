@@ -1,15 +1,24 @@
 import pandas as pd
 import numpy as np
 from datetime import datetime, timedelta
-import ta  # Technical analysis library for indicators
+from dashboard.angel_one import AngelOneAPI
 
-class MockAngelOneAPI:
-    def __init__(self):
+# Run with: python -m dashboard.management.commands.test_mock_trading_alerts
+
+class MockAngelOneAPI(AngelOneAPI):
+    """AngelOneAPI that serves seeded, patterned mock data instead of calling the broker
+    
+    Indicators and alert checks come from the real AngelOneAPI.
+    """
+    
+    def __init__(self, seed=42):
         """Initialize mock API"""
-        pass
+        super().__init__()
+        self.rng = np.random.default_rng(seed)
         
     def generate_mock_data(self, symbol, days=60):
         """Generate mock historical price data for testing with patterns that trigger alerts"""
+        rng = self.rng
         end_date = datetime.now()
         start_date = end_date - timedelta(days=days)
         
@@ -28,12 +37,12 @@ class MockAngelOneAPI:
             
             # First half with downtrend
             for i in range(1, len(date_range)//2):
-                daily_change = np.random.normal(-0.002, volatility/base_price/2)
+                daily_change = rng.normal(-0.002, volatility/base_price/2)
                 closes[i] = closes[i-1] * (1 + daily_change)
             
             # Second half with uptrend (bullish reversal)
             for i in range(len(date_range)//2, len(date_range)):
-                daily_change = np.random.normal(0.003, volatility/base_price/2)
+                daily_change = rng.normal(0.003, volatility/base_price/2)
                 closes[i] = closes[i-1] * (1 + daily_change)
             
             # Create a MACD crossover in the last few days
@@ -50,12 +59,12 @@ class MockAngelOneAPI:
             
             # Slight uptrend, then strong momentum at the end
             for i in range(1, len(date_range)-10):
-                daily_change = np.random.normal(0.0005, volatility/base_price/3)
+                daily_change = rng.normal(0.0005, volatility/base_price/3)
                 closes[i] = closes[i-1] * (1 + daily_change)
             
             # Strong bullish momentum in the last 10 days (will trigger overbought RSI)
             for i in range(len(date_range)-10, len(date_range)):
-                daily_change = np.random.normal(0.006, volatility/base_price/4)
+                daily_change = rng.normal(0.006, volatility/base_price/4)
                 closes[i] = closes[i-1] * (1 + daily_change)
                 
         else: # HDFCBANK
@@ -69,22 +78,22 @@ class MockAngelOneAPI:
             
             # First 40 days with slight uptrend
             for i in range(1, 40):
-                daily_change = np.random.normal(0.001, volatility/base_price/3)
+                daily_change = rng.normal(0.001, volatility/base_price/3)
                 closes[i] = closes[i-1] * (1 + daily_change)
             
             # Last 20 days with downtrend (will go below SMA50)
             for i in range(40, len(date_range)):
-                daily_change = np.random.normal(-0.004, volatility/base_price/3)
+                daily_change = rng.normal(-0.004, volatility/base_price/3)
                 closes[i] = closes[i-1] * (1 + daily_change)
             
             # Extra drop in the last few days
             closes[-5:] = closes[-5] * np.array([1.0, 0.99, 0.98, 0.975, 0.97])
             
         # Calculate other price values based on close
-        opens = closes * (1 + np.random.normal(0, 0.005, len(closes)))
-        highs = np.maximum(opens, closes) * (1 + np.abs(np.random.normal(0, 0.01, len(closes))))
-        lows = np.minimum(opens, closes) * (1 - np.abs(np.random.normal(0, 0.01, len(closes))))
-        volumes = np.random.normal(1000000, 200000, len(closes)).astype(int)
+        opens = closes * (1 + rng.normal(0, 0.005, len(closes)))
+        highs = np.maximum(opens, closes) * (1 + np.abs(rng.normal(0, 0.01, len(closes))))
+        lows = np.minimum(opens, closes) * (1 - np.abs(rng.normal(0, 0.01, len(closes))))
+        volumes = rng.normal(1000000, 200000, len(closes)).astype(int)
         volumes = np.abs(volumes)
         
         # Create DataFrame
@@ -99,79 +108,6 @@ class MockAngelOneAPI:
         
         df.set_index('timestamp', inplace=True)
         return df
-        
-    def add_indicators(self, dataframe):
-        """Add technical indicators to the dataframe"""
-        if dataframe is None or dataframe.empty:
-            return None
-        
-        # Add RSI (Relative Strength Index)
-        dataframe['rsi'] = ta.momentum.RSIIndicator(dataframe['close']).rsi()
-        
-        # Add MACD (Moving Average Convergence Divergence)
-        macd = ta.trend.MACD(dataframe['close'])
-        dataframe['macd'] = macd.macd()
-        dataframe['macd_signal'] = macd.macd_signal()
-        dataframe['macd_histogram'] = macd.macd_diff()
-        
-        # Add Bollinger Bands
-        bollinger = ta.volatility.BollingerBands(dataframe['close'])
-        dataframe['bollinger_high'] = bollinger.bollinger_hband()
-        dataframe['bollinger_low'] = bollinger.bollinger_lband()
-        dataframe['bollinger_mid'] = bollinger.bollinger_mavg()
-        
-        # Add Moving Averages
-        dataframe['sma_20'] = ta.trend.SMAIndicator(dataframe['close'], window=20).sma_indicator()
-        dataframe['sma_50'] = ta.trend.SMAIndicator(dataframe['close'], window=50).sma_indicator()
-        dataframe['sma_200'] = ta.trend.SMAIndicator(dataframe['close'], window=200).sma_indicator()
-        
-        # Add ATR (Average True Range)
-        dataframe['atr'] = ta.volatility.AverageTrueRange(dataframe['high'], dataframe['low'], dataframe['close']).average_true_range()
-        
-        return dataframe
-            
-    def check_alerts(self, dataframe, symbol, conditions):
-        """Check if any alert conditions are met"""
-        if dataframe is None or dataframe.empty:
-            return []
-            
-        alerts = []
-        latest = dataframe.iloc[-1]
-        
-        # Example conditions (customize based on your requirements)
-        if 'rsi_overbought' in conditions and latest['rsi'] > conditions['rsi_overbought']:
-            alerts.append(f"{symbol}: RSI Overbought ({latest['rsi']:.2f})")
-            
-        if 'rsi_oversold' in conditions and latest['rsi'] < conditions['rsi_oversold']:
-            alerts.append(f"{symbol}: RSI Oversold ({latest['rsi']:.2f})")
-        
-        if 'macd_crossover' in conditions and conditions['macd_crossover']:
-            # Check if MACD line crosses above signal line
-            if dataframe['macd'].iloc[-2] < dataframe['macd_signal'].iloc[-2] and \
-               latest['macd'] > latest['macd_signal']:
-                alerts.append(f"{symbol}: MACD Bullish Crossover")
-                
-        if 'macd_crossunder' in conditions and conditions['macd_crossunder']:
-            # Check if MACD line crosses below signal line
-            if dataframe['macd'].iloc[-2] > dataframe['macd_signal'].iloc[-2] and \
-               latest['macd'] < latest['macd_signal']:
-                alerts.append(f"{symbol}: MACD Bearish Crossunder")
-        
-        if 'price_above_sma' in conditions and latest['close'] > latest['sma_' + str(conditions['price_above_sma'])]:
-            alerts.append(f"{symbol}: Price Above SMA{conditions['price_above_sma']}")
-            
-        if 'price_below_sma' in conditions and latest['close'] < latest['sma_' + str(conditions['price_below_sma'])]:
-            alerts.append(f"{symbol}: Price Below SMA{conditions['price_below_sma']}")
-            
-        if 'bollinger_breakout_up' in conditions and conditions['bollinger_breakout_up']:
-            if latest['close'] > latest['bollinger_high']:
-                alerts.append(f"{symbol}: Bollinger Band Upper Breakout")
-                
-        if 'bollinger_breakout_down' in conditions and conditions['bollinger_breakout_down']:
-            if latest['close'] < latest['bollinger_low']:
-                alerts.append(f"{symbol}: Bollinger Band Lower Breakout")
-                
-        return alerts
 
 def main():
     # Initialize Mock API
@@ -202,7 +138,7 @@ def main():
         
         if df is not None and not df.empty:
             # Add technical indicators
-            df = api.add_indicators(df)
+            df = api.add_indicators(df).materialize()
             
             # Check for alerts
             alerts = api.check_alerts(df, symbol, alert_conditions)
@@ -0,0 +1,263 @@
+import os
+import json
+from datetime import date, timedelta
+import pandas as pd
+
+
+IST = 'Asia/Kolkata'
+
+# Regular NSE/BSE equity session, as offsets from midnight IST
+SESSION_OPEN = pd.Timedelta(hours=9, minutes=15)
+SESSION_CLOSE = pd.Timedelta(hours=15, minutes=30)
+
+# Intraday bar lengths; 1day and 1week bars close with the session
+INTRADAY_DELTAS = {
+    '1min': pd.Timedelta(minutes=1),
+    '5min': pd.Timedelta(minutes=5),
+    '15min': pd.Timedelta(minutes=15),
+    '4h': pd.Timedelta(hours=4),
+}
+
+# Furthest back history_start looks, whatever the number of bars requested
+MAX_HISTORY_DAYS = 3660
+
+# Most history_start results and days of bar closes remembered; each cache
+# is dropped all at once when full
+CALENDAR_CACHE_SIZE = 4096
+
+# Exchange holidays, one list of ISO dates per exchange. Update it every year
+# from the exchange circulars; dates not listed are treated as trading days
+# unless they fall on a weekend.
+DEFAULT_HOLIDAYS_PATH = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), 'data', 'market_holidays.json'
+)
+
+
+def to_ist(timestamp=None):
+    """Convert a timestamp to a tz-aware IST timestamp (naive values are assumed to be IST)
+
+    Defaults to the current time.
+    """
+    timestamp = pd.Timestamp(timestamp) if timestamp is not None else pd.Timestamp.now(tz=IST)
+    if timestamp.tzinfo is None:
+        return timestamp.tz_localize(IST)
+    return timestamp.tz_convert(IST)
+
+
+def session_bar_starts(index, timeframe):
+    """Get the session-aligned bar start for every timestamp of a DatetimeIndex
+
+    Intraday bars are counted from the 09:15 open, so 15min bars start at
+    09:15, 09:30, ... and 4h bars at 09:15 and 13:15. Weekly bars start on Monday.
+    """
+    days = index.normalize()
+
+    if timeframe == '1week':
+        return days - pd.to_timedelta(index.weekday, unit='D')
+    if timeframe == '1day':
+        return days
+
+    delta = INTRADAY_DELTAS[timeframe]
+    anchors = days + SESSION_OPEN
+    return anchors + ((index - anchors) // delta) * delta
+
+
+class MarketCalendar:
+    """NSE/BSE trading days, session times and bar-close times per alert timeframe
+
+    All times are tz-aware IST timestamps; naive inputs are assumed to be IST.
+    """
+
+    def __init__(self, holidays_path=None, exchange='NSE'):
+        self.holidays_path = holidays_path or os.getenv('MARKET_HOLIDAYS_PATH', DEFAULT_HOLIDAYS_PATH)
+        self.exchange = exchange
+        self._holidays = None
+        self._warned_years = set()
+        self._history_starts = {}
+        self._bar_closes = {}
+
+    @property
+    def holidays(self):
+        if self._holidays is None:
+            try:
+                with open(self.holidays_path) as f:
+                    data = json.load(f)
+                self._holidays = {date.fromisoformat(day) for day in data.get(self.exchange, [])}
+            except Exception as e:
+                print(f"Error loading market holidays from {self.holidays_path}: {str(e)}")
+                self._holidays = set()
+        return self._holidays
+
+    def covers(self, year):
+        """Check whether the holiday file lists any holiday in a year"""
+        return any(day.year == year for day in self.holidays)
+
+    def is_trading_day(self, day):
+        """Check whether the exchange is open on a date"""
+        if isinstance(day, pd.Timestamp):
+            day = day.date()
+        self._check_coverage(day.year)
+        return day.weekday() < 5 and day not in self.holidays
+
+    def _check_coverage(self, year):
+        # Warn once, and only for the year being traded now
+        if year != date.today().year or year in self._warned_years:
+            return
+        self._warned_years.add(year)
+        if not self.covers(year):
+            print(f"Warning: {self.holidays_path} lists no {self.exchange} holidays for {year}; "
+                  f"every weekday is treated as a trading day until it is updated")
+
+    def previous_trading_day(self, day):
+        """Get the last trading day strictly before a date"""
+        day -= timedelta(days=1)
+        while not self.is_trading_day(day):
+            day -= timedelta(days=1)
+        return day
+
+    def next_trading_day(self, day):
+        """Get the first trading day strictly after a date"""
+        day += timedelta(days=1)
+        while not self.is_trading_day(day):
+            day += timedelta(days=1)
+        return day
+
+    def session(self, day):
+        """Get the (open, close) timestamps of a trading day"""
+        midnight = pd.Timestamp(day).tz_localize(IST)
+        return midnight + SESSION_OPEN, midnight + SESSION_CLOSE
+
+    def is_market_open(self, now=None):
+        """Check whether the regular session is in progress"""
+        now = to_ist(now)
+        if not self.is_trading_day(now.date()):
+            return False
+        session_open, session_close = self.session(now.date())
+        return session_open <= now < session_close
+
+    def bar_closes(self, day, timeframe):
+        """Get every bar-close time of a timeframe on a trading day, in order"""
+        key = (day, timeframe)
+        closes = self._bar_closes.get(key)
+        if closes is None:
+            if len(self._bar_closes) >= CALENDAR_CACHE_SIZE:
+                self._bar_closes.clear()
+            closes = self._bar_closes[key] = tuple(self._compute_bar_closes(day, timeframe))
+        return list(closes)
+
+    def _compute_bar_closes(self, day, timeframe):
+        if not self.is_trading_day(day):
+            return []
+
+        session_open, session_close = self.session(day)
+
+        if timeframe == '1week':
+            # The weekly bar closes on the last trading day of the week
+            next_day = self.next_trading_day(day)
+            if next_day.isocalendar()[:2] == day.isocalendar()[:2]:
+                return []
+            return [session_close]
+
+        delta = INTRADAY_DELTAS.get(timeframe)
+        if delta is None:
+            return [session_close]
+
+        closes = []
+        bar_start = session_open
+        while bar_start < session_close:
+            closes.append(min(bar_start + delta, session_close))
+            bar_start += delta
+        return closes
+
+    def last_bar_close(self, timeframe, now=None):
+        """Get the most recent bar-close time of a timeframe at or before now"""
+        now = to_ist(now)
+        day = now.date()
+        if not self.is_trading_day(day):
+            day = self.previous_trading_day(day)
+
+        # Look back far enough to cover a weekly bar and long holiday breaks
+        for _ in range(15):
+            closes = [close for close in self.bar_closes(day, timeframe) if close <= now]
+            if closes:
+                return closes[-1]
+            day = self.previous_trading_day(day)
+        return None
+
+    def next_bar_close(self, timeframe, now=None):
+        """Get the first bar-close time of a timeframe strictly after now"""
+        now = to_ist(now)
+        day = now.date()
+        if not self.is_trading_day(day):
+            day = self.next_trading_day(day)
+
+        for _ in range(15):
+            closes = [close for close in self.bar_closes(day, timeframe) if close > now]
+            if closes:
+                return closes[0]
+            day = self.next_trading_day(day)
+        return None
+
+    def bar_closes_between(self, timeframe, start, end, limit=None):
+        """Get the bar-close times of a timeframe after start and up to end, oldest first
+
+        With a limit, only the newest closes are returned.
+        """
+        start, end = to_ist(start), to_ist(end)
+        closes = []
+        day = end.date()
+        while day >= start.date():
+            day_closes = [close for close in self.bar_closes(day, timeframe) if start < close <= end]
+            closes[:0] = day_closes
+            if limit and len(closes) >= limit:
+                return closes[-limit:]
+            day -= timedelta(days=1)
+        return closes
+
+    def history_start(self, timeframe, bars, now=None):
+        """Get where a fetch has to start to cover the latest closed bars of a timeframe
+
+        Counts trading sessions back from now until they hold at least bars
+        closed bars, and returns the open of the earliest one. Whole sessions
+        are counted, so the range may hold a few bars more than asked for.
+        The result only changes when a bar closes, so it is computed once per
+        (timeframe, bars, day, last close).
+        """
+        now = to_ist(now)
+        key = (timeframe, bars, now.date(), self.last_bar_close(timeframe, now))
+        start = self._history_starts.get(key)
+        if start is None:
+            if len(self._history_starts) >= CALENDAR_CACHE_SIZE:
+                self._history_starts.clear()
+            start = self._history_starts[key] = self._history_start(timeframe, bars, now)
+        return start
+
+    def _history_start(self, timeframe, bars, now):
+        day = now.date()
+        if not self.is_trading_day(day):
+            day = self.previous_trading_day(day)
+        earliest = now.date() - timedelta(days=MAX_HISTORY_DAYS)
+
+        current_week = now.isocalendar()[:2]
+        weeks = set()
+        count = 0
+        while True:
+            if timeframe == '1week':
+                # Every earlier week with a trading day is a closed weekly bar
+                week = day.isocalendar()[:2]
+                if week != current_week:
+                    weeks.add(week)
+                count = len(weeks)
+            else:
+                count += len([close for close in self.bar_closes(day, timeframe) if close <= now])
+
+            if count >= bars or day <= earliest:
+                if timeframe == '1week':
+                    # Start from the Monday, where the weekly bar starts
+                    day -= timedelta(days=day.weekday())
+                return self.session(day)[0]
+            day = self.previous_trading_day(day)
+
+
+# Calendar shared by the scheduler and evaluation engine
+market_calendar = MarketCalendar()
@@ -0,0 +1,33 @@
+# Generated by Django 5.2.18 on 2026-10-18 10:32
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0008_alertlog'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EvaluatedClose',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('timeframe', models.CharField(max_length=10, unique=True)),
+                ('close', models.DateTimeField()),
+            ],
+        ),
+        migrations.CreateModel(
+            name='LaggingSeries',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('symbol', models.CharField(max_length=10)),
+                ('timeframe', models.CharField(max_length=10)),
+                ('missed', models.DateTimeField()),
+            ],
+            options={
+                'unique_together': {('symbol', 'timeframe')},
+            },
+        ),
+    ]
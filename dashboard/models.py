@@ -10,6 +10,12 @@ class Stock(models.Model):
     def __str__(self):
         return f"{self.name} ({self.symbol})"
 
+    @property
+    def token(self):
+        """Angel One symbol token, resolved through the cached instrument master"""
+        from .instruments import resolve_token
+        return resolve_token(self.symbol)
+
 class StockGroup(models.Model):
     name = models.CharField(max_length=100)
     user = models.ForeignKey(User, on_delete=models.CASCADE)
@@ -124,4 +130,24 @@ class AlertLog(models.Model):
         ordering = ['-timestamp']
     
     def __str__(self):
-        return f"{self.stock_symbol} - {self.event_type} at {self.timestamp}"
\ No newline at end of file
+        return f"{self.stock_symbol} - {self.event_type} at {self.timestamp}"
+
+class EvaluatedClose(models.Model):
+    """Bar close the alerts on a timeframe were last evaluated for, kept for the evaluation scheduler"""
+    timeframe = models.CharField(max_length=10, unique=True)
+    close = models.DateTimeField()
+
+    def __str__(self):
+        return f"{self.timeframe} evaluated up to {self.close}"
+
+class LaggingSeries(models.Model):
+    """Series skipped for stale or missing candles, with the first bar close it missed"""
+    symbol = models.CharField(max_length=10)
+    timeframe = models.CharField(max_length=10)
+    missed = models.DateTimeField()
+
+    class Meta:
+        unique_together = ('symbol', 'timeframe')
+
+    def __str__(self):
+        return f"{self.symbol} {self.timeframe} lagging since {self.missed}"
@@ -5,8 +5,6 @@ from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 from dotenv import load_dotenv
 from django.contrib.auth.models import User
-from datetime import datetime, timedelta
-import json
 
 # Load environment variables
 load_dotenv()
@@ -188,7 +186,7 @@ class NotificationManager:
             return {'error': str(e)}
 
     def check_alert_conditions(self, alert):
-        """Check if the alert conditions are met using AngelOne API data
+        """Check if the alert conditions are met using the configured market data provider
         
         Args:
             alert (Alert): The alert to check
@@ -196,14 +194,11 @@ class NotificationManager:
         Returns:
             bool: True if alert condition is met, False otherwise
         """
-        from .angel_one import AngelOneAPI
-        from .models import Stock, StockGroup
-        import json
+        from .utils import get_historical_data
+        from .plans import alert_plans
         
-        api = AngelOneAPI()
-        if not api.connect():
-            print("✗ Failed to connect to Angel One API")
-            return False
+        # Indicators come from the same registry and compiled plan as check_alerts
+        plan = alert_plans.get(alert)
             
         # Determine stocks to check based on alert type
         stocks_to_check = []
@@ -215,57 +210,28 @@ class NotificationManager:
         triggered_alerts = []
         
         for stock in stocks_to_check:
-            # Get historical data for the stock
-            from_date = datetime.now() - timedelta(days=30)  # Get data for last 30 days
-            to_date = datetime.now()
-            
-            # Format dates as required by API
-            from_date_str = from_date.strftime('%Y-%m-%d')
-            to_date_str = to_date.strftime('%Y-%m-%d')
-            
-            # Get data for the specified timeframe
-            dataframe = api.get_historical_data(
-                symbol=stock.symbol,
-                exchange="NSE",  # Assuming NSE, adjust as needed
-                interval=alert.timeframe,
-                from_date=from_date_str,
-                to_date=to_date_str
-            )
+            # Get the alert's lookback of history, plus the bar still forming
+            dataframe = get_historical_data(stock.symbol, alert.timeframe, limit=max(plan.lookback, 1) + 1)
             
             if dataframe is None or dataframe.empty:
                 print(f"✗ No data available for {stock.symbol}")
                 continue
-                
-            # Parse indicator parameters
-            try:
-                indicator1_params = json.loads(alert.indicator1_params)
-                indicator2_params = json.loads(alert.indicator2_params)
-            except json.JSONDecodeError:
-                print(f"✗ Invalid JSON in indicator parameters for alert {alert.id}")
+            if dataframe.attrs.get('stale'):
+                print(f"✗ Candles for {stock.symbol} are {dataframe.attrs.get('age')} old; not checking")
                 continue
                 
-            # Get indicator values
-            indicator1_value = self._get_indicator_value(dataframe, alert.indicator1.name, indicator1_params)
-            indicator2_value = self._get_indicator_value(dataframe, alert.indicator2.name, indicator2_params)
+            # Check if condition is met
+            is_triggered, indicator1_value, indicator2_value = plan.evaluate(dataframe)
             
             if indicator1_value is None or indicator2_value is None:
                 print(f"✗ Could not compute indicator values for alert {alert.id}")
                 continue
                 
-            # Check if condition is met
-            is_triggered = False
-            if alert.condition == 'above' and indicator1_value > indicator2_value:
-                is_triggered = True
-            elif alert.condition == 'below' and indicator1_value < indicator2_value:
-                is_triggered = True
-            elif alert.condition == 'equals' and abs(indicator1_value - indicator2_value) < 0.0001:  # Close enough to equal
-                is_triggered = True
-                
             if is_triggered:
                 triggered_alerts.append({
                     'stock': stock,
-                    'indicator1': f"{alert.indicator1.name}({indicator1_params.get('period', '')})",
-                    'indicator2': f"{alert.indicator2.name}({indicator2_params.get('period', '')})",
+                    'indicator1': plan.indicator1.label,
+                    'indicator2': plan.indicator2.label,
                     'indicator1_value': round(indicator1_value, 2),
                     'indicator2_value': round(indicator2_value, 2),
                     'condition': alert.condition
@@ -277,13 +243,8 @@ class NotificationManager:
             subject = f"Trading Alert: {len(triggered_alerts)} condition(s) met"
             message = "The following alert conditions have been met:\n\n"
             
+            condition_text = plan.condition_label
             for triggered in triggered_alerts:
-                condition_text = {
-                    'above': 'crossed above',
-                    'below': 'crossed below',
-                    'equals': 'equals'
-                }.get(triggered['condition'], triggered['condition'])
-                
                 message += (f"Stock: {triggered['stock'].symbol} - {triggered['stock'].name}\n"
                            f"{triggered['indicator1']} ({triggered['indicator1_value']}) {condition_text} "
                            f"{triggered['indicator2']} ({triggered['indicator2_value']})\n\n")
@@ -294,49 +255,6 @@ class NotificationManager:
             
         return False
         
-    def _get_indicator_value(self, dataframe, indicator_name, params):
-        """Get the latest value of the specified indicator from the dataframe
-        
-        Args:
-            dataframe (DataFrame): Historical price data with indicators
-            indicator_name (str): Name of the indicator
-            params (dict): Parameters for the indicator
-            
-        Returns:
-            float: The indicator value, or None if it couldn't be computed
-        """
-        # Get the most recent row
-        if dataframe.empty:
-            return None
-            
-        latest = dataframe.iloc[-1]
-        period = params.get('period', 14)  # Default period
-        
-        # Map indicator names to their column names in the dataframe
-        indicator_map = {
-            'RSI': f'rsi',
-            'MACD': f'macd',
-            'EMA': f'sma_{period}',  # Using SMA as proxy for EMA
-            'SMA': f'sma_{period}',
-            'Bollinger Upper': f'bollinger_high',
-            'Bollinger Lower': f'bollinger_low',
-            'Bollinger Middle': f'bollinger_mid',
-            'Price': 'close'
-        }
-        
-        # Get the column name for this indicator
-        column = indicator_map.get(indicator_name)
-        if not column:
-            print(f"✗ Unknown indicator: {indicator_name}")
-            return None
-            
-        # Return the indicator value
-        if column in latest:
-            return latest[column]
-        else:
-            print(f"✗ Column {column} not found in dataframe")
-            return None
-            
     def send_notification(self, subject, message, notification_types=None):
         """Send notifications through all enabled channels or specified channels
         
@@ -0,0 +1,199 @@
+import json
+import operator
+import threading
+from dataclasses import dataclass
+from functools import lru_cache
+
+from .indicators import get_indicator
+
+
+# Values this close count as equal
+EQUALS_TOLERANCE = 0.0001
+
+CONDITION_OPERATORS = {
+    'above': operator.gt,
+    'below': operator.lt,
+    'equals': lambda a, b: abs(a - b) < EQUALS_TOLERANCE,
+}
+
+CONDITION_LABELS = {
+    'above': "crossed above",
+    'below': "crossed below",
+}
+
+
+@dataclass(frozen=True)
+class IndicatorPlan:
+    """An indicator resolved from the registry with canonical parameters
+
+    params holds every declared parameter, defaults filled in, as (name,
+    value) pairs in argument order, so equal indicators compare and hash
+    equal however their JSON was written. spec is None for indicators that
+    are not registered; they never produce a value.
+    """
+
+    name: str
+    params: tuple
+    spec: object
+    lookback: int
+    label: str
+
+    @property
+    def key(self):
+        return (self.name, self.params)
+
+    def series(self, df):
+        """Calculate the indicator over a candle frame"""
+        if self.spec is None or df is None or df.empty:
+            return None
+        return self.spec.compute(df['close'], self.params)
+
+    def value(self, df):
+        """Calculate the latest value of the indicator, or None"""
+        if df is None or df.empty:
+            return None
+        return self.latest(df['close'])
+
+    def latest(self, close):
+        """Calculate the latest value of the indicator over a close Series, or None"""
+        if self.spec is None or close.empty:
+            return None
+        result = self.spec.compute(close, self.params)
+        if result is None or result.empty:
+            return None
+        return result.iloc[-1]
+
+
+@dataclass(frozen=True)
+class AlertPlan:
+    """Everything needed to evaluate an alert, resolved once from the model"""
+
+    alert_id: int
+    timeframe: str
+    indicator1: IndicatorPlan
+    indicator2: IndicatorPlan
+    condition: str
+    compare: object
+    lookback: int
+
+    @property
+    def condition_label(self):
+        return CONDITION_LABELS.get(self.condition, "equals")
+
+    def is_triggered(self, indicator1_value, indicator2_value):
+        """Check the alert condition against two indicator values"""
+        if indicator1_value is None or indicator2_value is None or self.compare is None:
+            return False
+        return self.compare(indicator1_value, indicator2_value)
+
+    def evaluate(self, df):
+        """Evaluate the alert on a candle frame
+
+        Returns:
+        tuple: (is_triggered, indicator1_value, indicator2_value)
+        """
+        indicator1_value = self.indicator1.value(df)
+        indicator2_value = self.indicator2.value(df)
+        return self.is_triggered(indicator1_value, indicator2_value), indicator1_value, indicator2_value
+
+
+def parse_params(params):
+    """Parse indicator parameters stored as a JSON string"""
+    if isinstance(params, str):
+        try:
+            params = json.loads(params)
+        except json.JSONDecodeError:
+            params = {}
+    return params if isinstance(params, dict) else {}
+
+
+@lru_cache(maxsize=1024)
+def _compile_indicator(name, params_json):
+    raw = parse_params(params_json)
+
+    period = raw.get('period', '')
+    label = f"{name}({period})" if period else name
+
+    spec = get_indicator(name)
+    params = spec.canonical_params(raw) if spec else ()
+
+    return IndicatorPlan(
+        name=name,
+        params=params,
+        spec=spec,
+        lookback=spec.warmup_bars(params) if spec else 0,
+        label=label,
+    )
+
+
+def compile_indicator(name, params):
+    """Get the plan for an indicator name and its parameters (dict or JSON string)"""
+    if not isinstance(params, str):
+        params = json.dumps(params or {}, sort_keys=True)
+    return _compile_indicator(name, params)
+
+
+def compile_alert(alert):
+    """Compile an alert into an immutable evaluation plan"""
+    indicator1 = compile_indicator(alert.indicator1.name, alert.indicator1_params)
+    indicator2 = compile_indicator(alert.indicator2.name, alert.indicator2_params)
+
+    return AlertPlan(
+        alert_id=alert.pk,
+        timeframe=alert.timeframe,
+        indicator1=indicator1,
+        indicator2=indicator2,
+        condition=alert.condition,
+        compare=CONDITION_OPERATORS.get(alert.condition),
+        lookback=max(indicator1.lookback, indicator2.lookback),
+    )
+
+
+class PlanCache:
+    """Compiled plans per alert, invalidated when an alert or indicator changes
+
+    Plans are also keyed by the alert's evaluated fields, so a worker that
+    reloads a modified alert recompiles it even if the change was saved in
+    another process and the invalidation signal never reached this one.
+    """
+
+    def __init__(self):
+        self._plans = {}
+        self._lock = threading.Lock()
+        self.compiled = 0
+
+    @staticmethod
+    def _fingerprint(alert):
+        return (
+            alert.indicator1_id, alert.indicator1_params, alert.condition,
+            alert.indicator2_id, alert.indicator2_params, alert.timeframe,
+        )
+
+    def get(self, alert):
+        """Get the evaluation plan of an alert, compiling it on first use"""
+        if alert.pk is None:
+            return compile_alert(alert)
+
+        fingerprint = self._fingerprint(alert)
+        with self._lock:
+            cached = self._plans.get(alert.pk)
+        if cached is not None and cached[0] == fingerprint:
+            return cached[1]
+
+        plan = compile_alert(alert)
+        with self._lock:
+            self._plans[alert.pk] = (fingerprint, plan)
+            self.compiled += 1
+        return plan
+
+    def invalidate(self, alert_id):
+        with self._lock:
+            self._plans.pop(alert_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._plans.clear()
+
+
+# Alert plans shared by every evaluation in this process
+alert_plans = PlanCache()
@@ -0,0 +1,394 @@
+import os
+import time
+import zlib
+import threading
+import numpy as np
+import pandas as pd
+
+from .angel_one import get_angel_one_api
+from .candle_cache import TIMEFRAME_DELTAS, current_bar_start, candle_cache
+from .instruments import resolve_token
+from .candle_store import candle_store, OHLCV_COLUMNS
+from .indicator_frame import IndicatorFrame
+from .market_calendar import market_calendar, to_ist
+from .rollup import BASE_TIMEFRAMES, ANGEL_INTERVALS, rollup, rollup_cache
+
+
+# Longest date range Angel One returns in one candle request, per interval
+MAX_DAYS_PER_REQUEST = {'ONE_MINUTE': 30, 'ONE_DAY': 2000}
+
+# Seconds to wait before each background retry of a failed base series fetch
+REVALIDATE_DELAYS = (5, 15, 45, 120)
+
+# Recorded candle files used by the replay provider
+DEFAULT_REPLAY_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data')
+
+
+class MarketDataProvider:
+    """Source of candles and prices for the alert pipeline
+
+    Implementations return OHLCV DataFrames indexed by timestamp, oldest first.
+    """
+
+    name = None
+
+    def get_candles(self, symbol, interval="5min", limit=100):
+        """Get candles for a symbol and alert timeframe, or None if unavailable"""
+        raise NotImplementedError
+
+    def get_prices(self, symbols, exchange='NSE'):
+        """Get {symbol: latest price}; by default the close of the latest candle"""
+        prices = {}
+        for symbol in symbols:
+            df = self.get_candles(symbol, '1day', limit=1)
+            if df is not None and not df.empty:
+                prices[symbol] = df['close'].iloc[-1]
+        return prices
+
+
+class AngelOneProvider(MarketDataProvider):
+    """Live candles and prices from Angel One
+
+    Every timeframe is derived from one of two stored base series (1min or
+    1day), so a single fetch per symbol serves all timeframes built on it.
+    The base series reaches back just far enough, by the trading calendar,
+    for the longest history requested from it.
+
+    Requests make a single attempt. When one fails, the last good candles
+    from the candle store are served, marked stale (frame.attrs['stale'] and
+    frame.attrs['age']), while a background thread retries the fetch and
+    replaces the cached frames once it succeeds. Synthetic candles are only
+    served when ALLOW_SYNTHETIC_FALLBACK is set, and are marked
+    frame.attrs['synthetic'].
+    """
+
+    name = 'angelone'
+
+    def __init__(self, fallback=None):
+        self.fallback = fallback or SyntheticProvider()
+        # Earliest start requested per base series, so history the broker
+        # does not have is not asked for again on every bar
+        self._requested_from = {}
+        # Time of the last successful fetch and running refreshes, per base series
+        self._fetched_at = {}
+        self._refreshing = set()
+        self._lock = threading.Lock()
+
+    def get_candles(self, symbol, interval="5min", limit=100):
+        base_timeframe = BASE_TIMEFRAMES.get(interval, '1day')
+        from_date = market_calendar.history_start(interval, limit).tz_localize(None)
+
+        try:
+            # Use the worker's shared Angel One session
+            api = get_angel_one_api()
+
+            if api is None:
+                print(f"Failed to connect to Angel One API for {symbol}")
+                return self._fallback(symbol, interval, limit, from_date)
+
+            base = candle_cache.get_or_fetch(
+                symbol, base_timeframe,
+                lambda: self.fetch_base_candles(api, symbol, base_timeframe, from_date, attempts=1),
+                namespace='base',
+                size=self._base_size(from_date),
+                # Fetched by one worker and mapped by the others on the host
+                shared=True
+            )
+
+            if base is not None and not base.empty:
+                # Roll the base series up to the requested timeframe
+                df = rollup_cache.derive(symbol, interval, base).copy()
+
+                # Indicator columns are computed when first read
+                df = api.add_indicators(df)
+
+                return df
+            else:
+                print(f"No data returned from Angel One API for {symbol}")
+                return self._fallback(symbol, interval, limit, from_date)
+
+        except Exception as e:
+            print(f"Error fetching historical data for {symbol}: {str(e)}")
+            return self._fallback(symbol, interval, limit, from_date)
+
+    @staticmethod
+    def _base_size(from_date):
+        # Days of history, so a longer request on another timeframe refetches
+        return (to_ist().tz_localize(None) - from_date).days
+
+    def _fallback(self, symbol, interval, limit, from_date):
+        base_timeframe = BASE_TIMEFRAMES.get(interval, '1day')
+        self.revalidate(symbol, base_timeframe, from_date)
+
+        stale = self.stale_candles(symbol, interval, from_date)
+        if stale is not None:
+            print(f"Serving stale candles for {symbol} ({interval}), {stale.attrs['age']} old")
+            return stale
+
+        if not allow_synthetic_fallback():
+            print(f"No candles for {symbol} ({interval}); synthetic fallback is disabled")
+            return None
+
+        print(f"Generating mock data for {symbol} with {interval} interval")
+        df = self.fallback.get_candles(symbol, interval, limit)
+        if df is not None:
+            df.attrs['synthetic'] = True
+        return df
+
+    def stale_candles(self, symbol, interval, from_date, exchange='NSE'):
+        """Get the last good candles for a timeframe from the candle store, marked stale, or None"""
+        base_timeframe = BASE_TIMEFRAMES.get(interval, '1day')
+        base = candle_store.read(symbol, exchange, ANGEL_INTERVALS[base_timeframe], start=from_date)
+        if base is None or base.empty:
+            return None
+
+        df = IndicatorFrame(rollup(base, interval).copy())
+        with self._lock:
+            fetched_at = self._fetched_at.get((symbol, base_timeframe))
+        last_good = fetched_at if fetched_at is not None else base.index[-1].tz_localize(None)
+        df.attrs['stale'] = True
+        df.attrs['age'] = (to_ist().tz_localize(None) - last_good).floor('s')
+        return df
+
+    def revalidate(self, symbol, base_timeframe, from_date, exchange='NSE'):
+        """Retry fetching a base series in the background, unless already retrying
+
+        Once a retry succeeds, the fresh series replaces the cached one and the
+        frames derived from stale candles are dropped.
+        """
+        key = (symbol, base_timeframe)
+        with self._lock:
+            if key in self._refreshing:
+                return
+            self._refreshing.add(key)
+
+        def refresh():
+            try:
+                for delay in REVALIDATE_DELAYS:
+                    time.sleep(delay)
+                    api = get_angel_one_api()
+                    if api is None:
+                        continue
+                    base = self.fetch_base_candles(api, symbol, base_timeframe, from_date, exchange)
+                    if base is not None and not base.empty:
+                        candle_cache.put(
+                            symbol, base_timeframe, base, namespace='base',
+                            size=self._base_size(from_date), shared=True
+                        )
+                        candle_cache.invalidate(symbol, namespace='frame')
+                        print(f"Refreshed candles for {symbol} ({base_timeframe}) after a failed fetch")
+                        return
+                print(f"Giving up refreshing candles for {symbol} ({base_timeframe})")
+            except Exception as e:
+                print(f"Error refreshing candles for {symbol}: {str(e)}")
+            finally:
+                with self._lock:
+                    self._refreshing.discard(key)
+
+        threading.Thread(target=refresh, name=f"revalidate-{symbol}-{base_timeframe}", daemon=True).start()
+
+    def fetch_base_candles(self, api, symbol, base_timeframe, from_date, exchange='NSE', attempts=None):
+        """
+        Bring a stored base series up to date and return it from from_date on
+
+        Only bars from the newest stored candle onwards are requested; it is
+        re-fetched because it may still have been forming when stored. The
+        whole range is requested when the store does not reach back to
+        from_date yet. attempts caps the tries per request (see
+        AngelOneAPI.get_historical_data).
+
+        Returns:
+        pandas.DataFrame: OHLCV candles indexed by timestamp, or None if the request fails
+        """
+        angel_interval = ANGEL_INTERVALS[base_timeframe]
+        # Angel One dates are IST wall time, whatever the process time zone
+        now = to_ist().tz_localize(None)
+        key = (symbol, exchange, angel_interval)
+
+        start = from_date
+        bounds = candle_store.bounds(symbol, exchange, angel_interval)
+        with self._lock:
+            requested_from = self._requested_from.get(key)
+        if bounds is not None:
+            first, last = (timestamp.tz_localize(None) for timestamp in bounds)
+            covered = first <= from_date or (requested_from is not None and requested_from <= from_date)
+            if covered and last > from_date:
+                start = last
+
+        # Angel One caps the date range of a single candle request
+        chunk = pd.Timedelta(days=MAX_DAYS_PER_REQUEST[angel_interval])
+        while start < now:
+            end = min(start + chunk, now)
+            df = api.get_historical_data(
+                symbol=symbol,
+                exchange=exchange,
+                interval=angel_interval,
+                from_date=start.strftime('%Y-%m-%d %H:%M'),
+                to_date=end.strftime('%Y-%m-%d %H:%M'),
+                attempts=attempts
+            )
+
+            if df is None:
+                return None
+            if not df.empty:
+                candle_store.merge(symbol, exchange, angel_interval, df)
+            start = end
+
+        with self._lock:
+            self._requested_from[key] = min(from_date, requested_from or from_date)
+            self._fetched_at[(symbol, base_timeframe)] = now
+
+        # Range read straight from the mapped archive
+        return candle_store.read(symbol, exchange, angel_interval, start=from_date)
+
+    def get_prices(self, symbols, exchange='NSE'):
+        """Get the latest traded prices using batched quote requests"""
+        api = get_angel_one_api()
+        if api is None:
+            return {}
+
+        instruments = {}
+        for symbol in symbols:
+            token = resolve_token(symbol, exchange)
+            if token is not None:
+                instruments[symbol] = (exchange, token)
+
+        return api.get_ltps(instruments)
+
+
+class SyntheticProvider(MarketDataProvider):
+    """Seeded random-walk candles for offline runs and benchmarks
+
+    The same (seed, symbol, interval) always yields the same prices. Pass a
+    fixed end timestamp to also make the timestamps reproducible; by default
+    the series ends at the current bar.
+    """
+
+    name = 'synthetic'
+
+    def __init__(self, seed=None, end=None):
+        self.seed = int(seed if seed is not None else os.getenv('SYNTHETIC_SEED', '42'))
+        self.end = pd.Timestamp(end) if end is not None else None
+
+    def get_candles(self, symbol, interval="5min", limit=100):
+        rng = np.random.default_rng([self.seed, zlib.crc32(f"{symbol}:{interval}".encode())])
+
+        end = self.end if self.end is not None else current_bar_start(interval).tz_localize(None)
+        timestamps = pd.date_range(
+            end=end, periods=limit, freq=TIMEFRAME_DELTAS.get(interval, pd.Timedelta(days=1))
+        )
+
+        # Base price between 50-500
+        base_price = rng.uniform(50, 500)
+
+        # Generate random price movements
+        prices = rng.normal(0, 1, size=limit).cumsum() * (base_price * 0.01) + base_price
+
+        df = pd.DataFrame({
+            'open': prices,
+            'high': prices * rng.uniform(1.01, 1.05, size=limit),
+            'low': prices * rng.uniform(0.95, 0.99, size=limit),
+            'close': prices * rng.uniform(0.98, 1.02, size=limit),
+            'volume': rng.integers(1000, 100000, size=limit)
+        }, index=pd.DatetimeIndex(timestamps, name='timestamp'))
+
+        return df
+
+
+class ReplayProvider(MarketDataProvider):
+    """Serves recorded candles from CSV files
+
+    Looks for {symbol}_{interval}.csv in data_dir, then for the interval's
+    base series ({symbol}_1min.csv or {symbol}_1day.csv) and rolls it up. Daily
+    recordings saved as {symbol}_raw.csv by the test script count as 1day
+    bases. Setting as_of hides candles after that time, to step through a
+    recording as if it were live.
+    """
+
+    name = 'replay'
+
+    def __init__(self, data_dir=None, as_of=None):
+        self.data_dir = data_dir or os.getenv('REPLAY_DATA_DIR', DEFAULT_REPLAY_DIR)
+        self.as_of = as_of
+        self._frames = {}
+        self._lock = threading.Lock()
+
+    def _load(self, name):
+        with self._lock:
+            if name not in self._frames:
+                path = os.path.join(self.data_dir, f"{name}.csv")
+                df = None
+                if os.path.exists(path):
+                    df = pd.read_csv(path)
+                    df['timestamp'] = pd.to_datetime(df['timestamp'])
+                    df = df.set_index('timestamp')[OHLCV_COLUMNS].sort_index()
+                self._frames[name] = df
+            return self._frames[name]
+
+    def get_candles(self, symbol, interval="5min", limit=100):
+        df = self._load(f"{symbol}_{interval}")
+
+        if df is None:
+            base_timeframe = BASE_TIMEFRAMES.get(interval, '1day')
+            base = self._load(f"{symbol}_{base_timeframe}")
+            if base is None and base_timeframe == '1day':
+                base = self._load(f"{symbol}_raw")
+            df = rollup(base, interval)
+
+        if df is None:
+            print(f"No recorded candles for {symbol} ({interval}) in {self.data_dir}")
+            return None
+
+        if self.as_of is not None:
+            df = df.loc[:self.as_of]
+        if limit and len(df) > limit:
+            df = df.tail(limit)
+
+        return df
+
+
+def allow_synthetic_fallback():
+    """Whether AngelOneProvider may serve synthetic candles when no real ones are available
+
+    Off unless the ALLOW_SYNTHETIC_FALLBACK setting (or environment variable)
+    is set, so alerts are never evaluated on random prices in production.
+    """
+    try:
+        from django.conf import settings
+        allowed = getattr(settings, 'ALLOW_SYNTHETIC_FALLBACK', None)
+    except Exception:
+        allowed = None
+    if allowed is None:
+        allowed = os.getenv('ALLOW_SYNTHETIC_FALLBACK', 'False') == 'True'
+    return bool(allowed)
+
+
+PROVIDERS = {
+    AngelOneProvider.name: AngelOneProvider,
+    SyntheticProvider.name: SyntheticProvider,
+    ReplayProvider.name: ReplayProvider,
+}
+
+_provider = None
+
+
+def get_provider():
+    """Get the configured market data provider (MARKET_DATA_PROVIDER setting)"""
+    global _provider
+    if _provider is None:
+        try:
+            from django.conf import settings
+            name = getattr(settings, 'MARKET_DATA_PROVIDER', None)
+        except Exception:
+            name = None
+        name = name or os.getenv('MARKET_DATA_PROVIDER', AngelOneProvider.name)
+        _provider = PROVIDERS[name]()
+    return _provider
+
+
+def set_provider(provider):
+    """Replace the market data provider, e.g. for load tests, and drop cached candles"""
+    global _provider
+    _provider = provider
+    candle_cache.clear()
+    rollup_cache.clear()
@@ -0,0 +1,131 @@
+import os
+import threading
+import time
+
+
+# Published Angel One SmartAPI limits in requests per second, per endpoint.
+# Each can be overridden with ANGEL_RATE_LIMIT_<ENDPOINT> (e.g. ANGEL_RATE_LIMIT_CANDLE=2).
+DEFAULT_ENDPOINT_LIMITS = {
+    'candle': 3.0,
+    'quote': 10.0,
+    'ltp': 10.0,
+    'order': 20.0,
+}
+
+
+class TokenBucket:
+    """Thread-safe token bucket with adaptive rate
+
+    Requests are admitted as fast as max_rate allows (with bursts up to
+    capacity). When the broker signals a rate-limit error the rate is halved,
+    down to min_rate, and then recovers additively on every success.
+    """
+
+    def __init__(self, max_rate, capacity=None, min_rate=None):
+        self.max_rate = float(max_rate)
+        self.rate = self.max_rate
+        self.min_rate = float(min_rate) if min_rate else self.max_rate / 10
+        self.capacity = float(capacity) if capacity else max(1.0, self.max_rate)
+        self.tokens = self.capacity
+        self.waiting = 0
+        self._updated_at = time.monotonic()
+        self._cond = threading.Condition()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self._updated_at) * self.rate)
+        self._updated_at = now
+
+    def acquire(self, timeout=None):
+        """Block until a request may be sent
+
+        Parameters:
+        timeout (float): Maximum seconds to wait, or None to wait indefinitely
+
+        Returns:
+        bool: True if a token was taken, False if the timeout expired
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+
+        with self._cond:
+            self.waiting += 1
+            try:
+                while True:
+                    self._refill()
+                    if self.tokens >= 1:
+                        self.tokens -= 1
+                        return True
+
+                    wait = (1 - self.tokens) / self.rate
+                    if deadline is not None:
+                        remaining = deadline - time.monotonic()
+                        if remaining <= 0:
+                            return False
+                        wait = min(wait, remaining)
+
+                    self._cond.wait(wait)
+            finally:
+                self.waiting -= 1
+
+    def penalize(self):
+        """Shrink the rate after the broker rejected a request for exceeding its limit"""
+        with self._cond:
+            self._refill()
+            self.rate = max(self.min_rate, self.rate / 2)
+            self.tokens = 0
+
+    def reward(self):
+        """Recover the rate towards max_rate after a successful request"""
+        with self._cond:
+            if self.rate < self.max_rate:
+                self._refill()
+                self.rate = min(self.max_rate, self.rate + self.max_rate * 0.05)
+                self._cond.notify_all()
+
+
+class RateLimiter:
+    """Registry of per-endpoint token buckets shared by every API client in the process"""
+
+    def __init__(self, limits=None):
+        self.limits = dict(DEFAULT_ENDPOINT_LIMITS)
+        self.limits.update(limits or {})
+        self._buckets = {}
+        self._lock = threading.Lock()
+
+    def bucket(self, endpoint):
+        """Get the bucket for an endpoint, creating it from the configured limit on first use"""
+        with self._lock:
+            if endpoint not in self._buckets:
+                rate = os.getenv(f"ANGEL_RATE_LIMIT_{endpoint.upper()}", self.limits.get(endpoint, 1.0))
+                self._buckets[endpoint] = TokenBucket(float(rate))
+            return self._buckets[endpoint]
+
+    def acquire(self, endpoint, timeout=None):
+        """Block until a request to the endpoint may be sent"""
+        return self.bucket(endpoint).acquire(timeout)
+
+    def penalize(self, endpoint):
+        """Report a rate-limit rejection for the endpoint"""
+        self.bucket(endpoint).penalize()
+
+    def reward(self, endpoint):
+        """Report a successful request to the endpoint"""
+        self.bucket(endpoint).reward()
+
+    def stats(self):
+        """Get the current rate and queue depth of every endpoint"""
+        with self._lock:
+            buckets = dict(self._buckets)
+
+        return {
+            endpoint: {
+                'rate': round(bucket.rate, 3),
+                'max_rate': bucket.max_rate,
+                'queue_depth': bucket.waiting,
+            }
+            for endpoint, bucket in buckets.items()
+        }
+
+
+# Limiter shared by every Angel One client in this process
+rate_limiter = RateLimiter()
@@ -0,0 +1,88 @@
+import threading
+import pandas as pd
+
+from .market_calendar import session_bar_starts
+
+
+# Every alert timeframe is derived from one of two stored base series
+BASE_TIMEFRAMES = {
+    '1min': '1min',
+    '5min': '1min',
+    '15min': '1min',
+    '4h': '1min',
+    '1day': '1day',
+    '1week': '1day',
+}
+
+# Angel One interval names of the base series
+ANGEL_INTERVALS = {
+    '1min': 'ONE_MINUTE',
+    '1day': 'ONE_DAY',
+}
+
+OHLCV_AGGREGATION = {
+    'open': 'first',
+    'high': 'max',
+    'low': 'min',
+    'close': 'last',
+    'volume': 'sum',
+}
+
+
+def rollup(base, timeframe):
+    """Aggregate a base OHLCV series (indexed by timestamp) into session-aligned bars"""
+    if base is None or base.empty or timeframe == BASE_TIMEFRAMES.get(timeframe):
+        return base
+
+    starts = session_bar_starts(base.index, timeframe)
+    df = base[list(OHLCV_AGGREGATION)].groupby(starts).agg(OHLCV_AGGREGATION)
+    df.index.name = 'timestamp'
+    return df
+
+
+class RollupCache:
+    """Keeps derived series per (symbol, timeframe) and extends them incrementally
+
+    Only base bars from the start of the last derived bar onwards are
+    re-aggregated when the base series grows; earlier derived bars are final.
+    """
+
+    def __init__(self):
+        self._frames = {}
+        self._lock = threading.Lock()
+
+    def derive(self, symbol, timeframe, base):
+        """Get the derived series for a timeframe from its base series"""
+        if base is None or base.empty or timeframe == BASE_TIMEFRAMES.get(timeframe):
+            return base
+
+        key = (symbol, timeframe)
+        with self._lock:
+            existing = self._frames.get(key)
+
+        first_start = session_bar_starts(base.index[:1], timeframe)[0]
+        if existing is None or existing.empty or base.index[0] > existing.index[-1] \
+                or first_start < existing.index[0]:
+            # Nothing to extend, or the base now reaches further back
+            df = rollup(base, timeframe)
+        else:
+            last_start = existing.index[-1]
+            df = pd.concat([
+                existing[existing.index < last_start],
+                rollup(base.loc[last_start:], timeframe),
+            ])
+
+            # Drop derived bars that fell out of the base window
+            df = df[df.index >= first_start]
+
+        with self._lock:
+            self._frames[key] = df
+        return df
+
+    def clear(self):
+        with self._lock:
+            self._frames.clear()
+
+
+# Derived series shared by every fetch in this process
+rollup_cache = RollupCache()
@@ -0,0 +1,169 @@
+import threading
+import pandas as pd
+
+from .market_calendar import market_calendar, to_ist
+from .shared_cache import is_shared, shared_cache
+
+
+# Angel One needs a few seconds after a bar closes before it serves that bar
+SETTLE_DELAY = pd.Timedelta(seconds=5)
+
+# Most missed bars re-checked per timeframe when catching up
+MAX_CATCH_UP_BARS = 30
+
+# Cache key of the series still to be caught up on
+LAGGING_CACHE_KEY = 'scheduler:lagging'
+
+
+class EvaluationScheduler:
+    """Decides when alert evaluation is worth running
+
+    A timeframe is due when a bar has closed since it was last evaluated, so
+    every timeframe is evaluated at its own bar boundaries: 1min alerts every
+    minute, 4h alerts at 13:15 and 15:30, 1day alerts after the close.
+    Outside market hours, on weekends and on exchange holidays no bar closes,
+    so nothing is due and no candles are fetched. The last evaluated close per
+    timeframe is kept in the Django cache when it is shared between processes,
+    and in the database when it is not, so every worker sees the same one.
+
+    A series skipped because its candles were stale or missing is not held against its
+    timeframe: it is recorded as lagging from the first close it missed, and
+    only that series is caught up on in later runs.
+    """
+
+    def __init__(self, calendar=None, settle_delay=SETTLE_DELAY, max_catch_up=MAX_CATCH_UP_BARS):
+        self.calendar = calendar or market_calendar
+        self.settle_delay = settle_delay
+        self.max_catch_up = max_catch_up
+        self._evaluated = {}
+        self._lagging = {}
+        self._lock = threading.Lock()
+
+    def _key(self, timeframe):
+        return f"scheduler:last_evaluated:{timeframe}"
+
+    def last_evaluated(self, timeframe):
+        """Get the bar-close time a timeframe was last evaluated for, or None"""
+        if is_shared():
+            try:
+                value = shared_cache().get(self._key(timeframe))
+                return pd.Timestamp(value) if value is not None else None
+            except Exception as e:
+                print(f"Cache unavailable for evaluation schedule: {str(e)}")
+        elif shared_cache() is not None:
+            try:
+                from .models import EvaluatedClose
+                close = EvaluatedClose.objects.filter(timeframe=timeframe).values_list('close', flat=True).first()
+                return to_ist(close) if close is not None else None
+            except Exception as e:
+                print(f"Database unavailable for evaluation schedule: {str(e)}")
+        with self._lock:
+            return self._evaluated.get(timeframe)
+
+    def latest_close(self, timeframe, now=None):
+        """Get the close time of the newest bar that is available to fetch"""
+        now = to_ist(now)
+        return self.calendar.last_bar_close(timeframe, now - self.settle_delay)
+
+    def due_timeframes(self, timeframes, now=None):
+        """Get {timeframe: bar closes to evaluate} for the timeframes with a newly closed bar
+
+        Normally that is just the latest close. If earlier boundaries were
+        missed (worker down, slow cycle) they are included too, oldest first
+        and at most max_catch_up of them, so those bars can be caught up on.
+        """
+        due = {}
+        for timeframe in set(timeframes):
+            close = self.latest_close(timeframe, now)
+            if close is None:
+                continue
+            last = self.last_evaluated(timeframe)
+            if last is None:
+                due[timeframe] = [close]
+            elif close > last:
+                due[timeframe] = self.calendar.bar_closes_between(
+                    timeframe, last, close, limit=self.max_catch_up
+                )
+        return due
+
+    def mark_evaluated(self, timeframe, close):
+        """Record that alerts on a timeframe were evaluated up to a bar close"""
+        with self._lock:
+            self._evaluated[timeframe] = close
+        if is_shared():
+            try:
+                # Kept for a fortnight so a weekly close survives holiday breaks
+                shared_cache().set(self._key(timeframe), close.isoformat(), 14 * 24 * 3600)
+            except Exception as e:
+                print(f"Cache unavailable for evaluation schedule: {str(e)}")
+        elif shared_cache() is not None:
+            try:
+                from .models import EvaluatedClose
+                EvaluatedClose.objects.update_or_create(timeframe=timeframe, defaults={'close': close.to_pydatetime()})
+            except Exception as e:
+                print(f"Database unavailable for evaluation schedule: {str(e)}")
+
+    def lagging_series(self, now=None):
+        """Get {(symbol, timeframe): bar closes to evaluate} for the series skipped in earlier runs
+
+        Each series gets every close from the first one it missed up to the
+        latest, at most max_catch_up of them.
+        """
+        lagging = {}
+        for (symbol, timeframe), missed in self._load_lagging().items():
+            close = self.latest_close(timeframe, now)
+            if close is None or close < missed:
+                continue
+            closes = [missed] + self.calendar.bar_closes_between(timeframe, missed, close)
+            lagging[(symbol, timeframe)] = closes[-self.max_catch_up:]
+        return lagging
+
+    def set_lagging(self, skipped):
+        """Record the series skipped in a run, {(symbol, timeframe): bar closes}, replacing the previous ones"""
+        lagging = {key: min(closes) for key, closes in skipped.items() if closes}
+        with self._lock:
+            self._lagging = lagging
+        if is_shared():
+            try:
+                shared_cache().set(LAGGING_CACHE_KEY, [
+                    [symbol, timeframe, close.isoformat()] for (symbol, timeframe), close in lagging.items()
+                ], 14 * 24 * 3600)
+            except Exception as e:
+                print(f"Cache unavailable for evaluation schedule: {str(e)}")
+        elif shared_cache() is not None:
+            try:
+                from django.db import transaction
+                from .models import LaggingSeries
+                with transaction.atomic():
+                    LaggingSeries.objects.all().delete()
+                    LaggingSeries.objects.bulk_create([
+                        LaggingSeries(symbol=symbol, timeframe=timeframe, missed=close.to_pydatetime())
+                        for (symbol, timeframe), close in lagging.items()
+                    ])
+            except Exception as e:
+                print(f"Database unavailable for evaluation schedule: {str(e)}")
+
+    def _load_lagging(self):
+        if is_shared():
+            try:
+                return {
+                    (symbol, timeframe): to_ist(close)
+                    for symbol, timeframe, close in shared_cache().get(LAGGING_CACHE_KEY) or []
+                }
+            except Exception as e:
+                print(f"Cache unavailable for evaluation schedule: {str(e)}")
+        elif shared_cache() is not None:
+            try:
+                from .models import LaggingSeries
+                return {
+                    (symbol, timeframe): to_ist(missed)
+                    for symbol, timeframe, missed in LaggingSeries.objects.values_list('symbol', 'timeframe', 'missed')
+                }
+            except Exception as e:
+                print(f"Database unavailable for evaluation schedule: {str(e)}")
+        with self._lock:
+            return dict(self._lagging)
+
+
+# Schedule shared by the Celery tasks in this process
+evaluation_scheduler = EvaluationScheduler()
@@ -1,105 +1,218 @@
 from django.core.mail import send_mail
 from .models import Alert, Stock
-from .utils import get_historical_data, calculate_indicator, check_crossover
+from .candle_cache import candle_cache
+from .rate_limit import rate_limiter
+from .fetch_engine import fetch_engine
+from .plans import alert_plans
+from .alert_index import alert_index
+from .vector_engine import CrossSectionalEngine
+from .incremental import indicator_states
 from .notifications import NotificationManager
-import json
+from .utils import get_historical_data
 
-def check_alerts():
-    alerts = Alert.objects.filter(is_active=True)
-    for alert in alerts:
-        # Handle single stock alerts
-        if alert.alert_type == 'single':
-            check_single_stock_alert(alert)
-        # Handle multiple stock alerts
-        else:
-            check_multiple_stocks_alert(alert)
-
-def check_single_stock_alert(alert):
-    """Check an alert for a single stock"""
-    if not alert.stock:
-        return
-        
-    # Get historical data for the stock
-    historical_data = get_historical_data(alert.stock.symbol, alert.timeframe)
+def check_alerts(due=None, lagging=None):
+    """Check active alerts and notify users of the ones that trigger
     
-    if historical_data is not None:
-        # Check if conditions are met and trigger alert if they are
-        is_triggered, indicator1_value, indicator2_value = check_alert_conditions(
-            historical_data, alert
-        )
+    due maps timeframes to the bar closes to evaluate, oldest first (see
+    EvaluationScheduler.due_timeframes). Only alerts on those timeframes are
+    checked, once per closed bar so that missed bars are caught up on.
+    Without it every active alert is checked against the latest data.
+    lagging maps (symbol, timeframe) series skipped in earlier runs to the
+    closes they still have to be evaluated at (see
+    EvaluationScheduler.lagging_series); they are caught up on by themselves.
+    
+    Each (symbol, timeframe) series is fetched once, with just the history
+    its alerts need (see history_bars). Per timeframe, every
+    distinct indicator is computed for all symbols in one vectorized pass and
+    each alert is checked against the symbols it watches. A group alert fires
+    once, listing every stock in the group that met the condition.
+    
+    Series served stale, or not at all, because the broker request failed
+    are not evaluated.
+    
+    Returns:
+    dict: {(symbol, timeframe): bar closes} of the series skipped; they
+          should be evaluated again once fresh candles are back
+    """
+    # Drop candles from bars that have closed since the previous cycle
+    candle_cache.evict_expired()
+    
+    # Pick up alerts created or edited in other processes (e.g. the web app)
+    alert_index.refresh()
+    
+    # Bar closes to evaluate per (symbol, timeframe) series
+    series_closes = {
+        key: due[key[1]] if due is not None else [None]
+        for key in alert_index.series(list(due) if due is not None else None)
+    }
+    if due is not None:
+        for timeframe, closes in due.items():
+            if len(closes) > 1:
+                print(f"Catching up on {len(closes)} {timeframe} bars")
+        for (symbol, timeframe), closes in (lagging or {}).items():
+            if alert_index.alert_ids(symbol, timeframe):
+                print(f"Catching up on {len(closes)} {timeframe} bars for {symbol}")
+                series_closes[(symbol, timeframe)] = closes
+    
+    subscribers = {key: alert_index.alert_ids(*key) for key in series_closes}
+    alert_ids = set().union(*subscribers.values())
+    alerts = Alert.objects.filter(pk__in=alert_ids, is_active=True).select_related(
+        'user', 'stock', 'stock_group', 'indicator1', 'indicator2'
+    ).in_bulk()
+    
+    alert_symbols = {}
+    for (symbol, timeframe), ids in subscribers.items():
+        for alert_id in ids:
+            alert_symbols.setdefault(alert_id, []).append(symbol)
+    
+    # Fetch every series concurrently, then evaluate each timeframe as a whole
+    bars = history_bars(subscribers, alerts, series_closes)
+    fetch = lambda symbol, timeframe: get_historical_data(symbol, timeframe, limit=bars[(symbol, timeframe)])
+    frames = {}
+    skipped = {}
+    for symbol, timeframe, historical_data in fetch_engine.fetch_all(series_closes, fetch):
+        if historical_data is None or historical_data.attrs.get('stale'):
+            if historical_data is None:
+                print(f"Skipping {symbol} ({timeframe}): no candles")
+            else:
+                print(f"Skipping {symbol} ({timeframe}): candles are {historical_data.attrs.get('age')} old")
+            if due is not None:
+                skipped[(symbol, timeframe)] = series_closes[(symbol, timeframe)]
+            continue
+        frames.setdefault(timeframe, {})[symbol] = historical_data
+    
+    group_triggers = {}
+    indicators = 0
+    
+    for timeframe, timeframe_frames in frames.items():
+        timeframe_alerts = [
+            alert for alert in alerts.values() if alert.timeframe == timeframe
+        ]
+        closes = sorted({
+            close for symbol in timeframe_frames for close in series_closes[(symbol, timeframe)]
+        }) if due is not None else [None]
         
-        if is_triggered:
-            # Send notification using the notification manager
-            send_alert_notification(
-                alert.user, 
-                alert, 
-                alert.stock.symbol,
-                indicator1_value, 
-                indicator2_value
-            )
+        for close in closes:
+            # Indicators for all symbols with this close due in one vectorized pass
+            close_frames = {
+                symbol: closed_bars(df, close) if close is not None else df
+                for symbol, df in timeframe_frames.items()
+                if close in series_closes[(symbol, timeframe)]
+            }
+            engine = CrossSectionalEngine.from_frames(close_frames)
             
-            # Disable alert after it's triggered
-            alert.is_active = False
-            alert.save()
-
-def check_multiple_stocks_alert(alert):
-    """Check an alert for multiple stocks in a group"""
-    if not alert.stock_group:
-        return
-        
-    triggered_stocks = []
-    trigger_details = []
+            for alert in timeframe_alerts:
+                if not alert.is_active:
+                    continue
+                    
+                already_triggered = {detail['symbol'] for detail in group_triggers.get(alert.pk, [])}
+                symbols = [
+                    symbol for symbol in alert_symbols.get(alert.pk, [])
+                    if symbol in close_frames and symbol not in already_triggered
+                ]
+                
+                for symbol, indicator1_value, indicator2_value in engine.evaluate(alert_plans.get(alert), symbols):
+                    if alert.alert_type == 'single':
+                        # Send notification using the notification manager
+                        send_alert_notification(alert.user, alert, symbol, indicator1_value, indicator2_value)
+                        
+                        # Disable alert after it's triggered
+                        alert.is_active = False
+                        alert.save()
+                        break
+                    
+                    group_triggers.setdefault(alert.pk, []).append({
+                        'symbol': symbol,
+                        'indicator1_value': indicator1_value,
+                        'indicator2_value': indicator2_value
+                    })
+            
+            indicators += engine.computed
     
-    # Check each stock in the group
-    for stock in alert.stock_group.stocks.all():
-        historical_data = get_historical_data(stock.symbol, alert.timeframe)
+    # If any stock triggered a group alert, send one notification for the group
+    for alert_id, trigger_details in group_triggers.items():
+        alert = alerts[alert_id]
+        send_multiple_stocks_alert_notification(alert.user, alert, trigger_details)
         
-        if historical_data is not None:
-            # Check if conditions are met for this stock
-            is_triggered, indicator1_value, indicator2_value = check_alert_conditions(
-                historical_data, alert
-            )
-            
-            if is_triggered:
-                triggered_stocks.append(stock)
-                trigger_details.append({
-                    'symbol': stock.symbol,
-                    'indicator1_value': indicator1_value,
-                    'indicator2_value': indicator2_value
-                })
-    
-    # If any stock triggered the alert, send notification
-    if triggered_stocks:
-        send_multiple_stocks_alert_notification(
-            alert.user,
-            alert,
-            trigger_details
+        # Disable alert after it's triggered
+        alert.is_active = False
+        alert.save()
+    
+    print(f"Indicators: {indicators} computed for {len(alerts)} alerts")
+    stats = candle_cache.stats()
+    print(f"Candle cache: {stats['hits']} hits, {stats['misses']} misses "
+          f"({stats['shared_hits']} from other workers), "
+          f"{stats['evictions']} evictions, {stats['entries']} entries")
+    for endpoint, limit in rate_limiter.stats().items():
+        print(f"Rate limit [{endpoint}]: {limit['rate']}/{limit['max_rate']} req/s, "
+              f"{limit['queue_depth']} waiting")
+    
+    return skipped
+
+def history_bars(subscribers, alerts, closes=None):
+    """Get how many bars to fetch for each series so every alert watching it can be evaluated
+    
+    subscribers maps (symbol, timeframe) to alert ids, alerts maps ids to
+    alerts and closes maps series to the bar closes evaluated. A series needs
+    the longest lookback (period plus warm-up) among its alerts, and one more
+    bar per bar close evaluated, since the newest bar fetched is still forming.
+    """
+    lookbacks = {alert_id: alert_plans.get(alert).lookback for alert_id, alert in alerts.items()}
+    
+    bars = {}
+    for (symbol, timeframe), ids in subscribers.items():
+        lookback = max((lookbacks.get(alert_id, 0) for alert_id in ids), default=0)
+        count = len(closes.get((symbol, timeframe), [])) if closes is not None else 1
+        bars[(symbol, timeframe)] = max(lookback, 1) + count
+    return bars
+
+def check_series_alerts(symbol, timeframe, bars):
+    """Check every active alert watching a symbol on a timeframe against in-memory bars
+    
+    Used by the streaming engine when a bar closes, with the series' closed
+    bars as a CandleRing, so no history is downloaded or copied.
+    A group alert is triggered by the stock whose bar just closed.
+    """
+    alerts = Alert.objects.filter(
+        pk__in=alert_index.alert_ids(symbol, timeframe), is_active=True
+    ).select_related('user', 'stock_group', 'indicator1', 'indicator2')
+    
+    for alert in alerts:
+        # Indicator states advance by the one bar that closed instead of
+        # being recomputed over the whole history
+        is_triggered, indicator1_value, indicator2_value = indicator_states.evaluate(
+            alert_plans.get(alert), symbol, bars
         )
         
+        if not is_triggered:
+            continue
+            
+        if alert.alert_type == 'single':
+            send_alert_notification(alert.user, alert, symbol, indicator1_value, indicator2_value)
+        else:
+            send_multiple_stocks_alert_notification(alert.user, alert, [{
+                'symbol': symbol,
+                'indicator1_value': indicator1_value,
+                'indicator2_value': indicator2_value
+            }])
+            
         # Disable alert after it's triggered
         alert.is_active = False
         alert.save()
 
+def closed_bars(historical_data, close):
+    """Get the bars of a frame that had closed by a bar-close time
+    
+    A bar starting at or after the close is still forming and is left out.
+    """
+    index = historical_data.index
+    close = close.tz_localize(None) if index.tz is None else close.tz_convert(index.tz)
+    return historical_data[index < close]
+
 def check_alert_conditions(historical_data, alert):
     """Check if alert conditions are met for the given historical data"""
-    # Calculate indicator 1 value
-    indicator1_value = calculate_indicator(
-        historical_data, 
-        alert.indicator1.name, 
-        alert.indicator1_params
-    )
-    
-    # Calculate indicator 2 value
-    indicator2_value = calculate_indicator(
-        historical_data, 
-        alert.indicator2.name, 
-        alert.indicator2_params
-    )
-    
-    # Check if the condition is met
-    is_triggered = check_crossover(indicator1_value, indicator2_value, alert.condition)
-    
-    return is_triggered, indicator1_value, indicator2_value
+    # The compiled plan holds the resolved kernels, parameters and operator
+    return alert_plans.get(alert).evaluate(historical_data)
 
 def send_alert_notification(user, alert, symbol, indicator1_value, indicator2_value):
     """Send notification to user based on their preferences"""
@@ -145,27 +258,5 @@ def send_multiple_stocks_alert_notification(user, alert, trigger_details):
 
 def format_alert_condition(alert):
     """Format the alert condition components for display"""
-    try:
-        # Extract period values from parameters
-        params1 = json.loads(alert.indicator1_params)
-        params2 = json.loads(alert.indicator2_params)
-        
-        # Format indicator names with periods
-        period1 = params1.get('period', '')
-        period2 = params2.get('period', '')
-        
-        indicator1_str = f"{alert.indicator1.name}({period1})" if period1 else alert.indicator1.name
-        indicator2_str = f"{alert.indicator2.name}({period2})" if period2 else alert.indicator2.name
-    except:
-        indicator1_str = alert.indicator1.name
-        indicator2_str = alert.indicator2.name
-    
-    # Format condition for readability
-    if alert.condition == "above":
-        condition_str = "crossed above"
-    elif alert.condition == "below":
-        condition_str = "crossed below"
-    else:
-        condition_str = "equals"
-        
-    return indicator1_str, indicator2_str, condition_str
+    plan = alert_plans.get(alert)
+    return plan.indicator1.label, plan.indicator2.label, plan.condition_label
@@ -0,0 +1,27 @@
+def shared_cache():
+    """Get the Django cache used to coordinate processes, or None outside Django"""
+    try:
+        from django.conf import settings
+        if not settings.configured:
+            return None
+        from django.core.cache import cache
+        return cache
+    except Exception:
+        return None
+
+
+def is_shared():
+    """Check whether other processes see what is written to the Django cache
+
+    LocMemCache (the default CACHE_BACKEND) and DummyCache keep nothing
+    outside the current process.
+    """
+    if shared_cache() is None:
+        return False
+    try:
+        from django.core.cache import caches
+        from django.core.cache.backends.locmem import LocMemCache
+        from django.core.cache.backends.dummy import DummyCache
+        return not isinstance(caches['default'], (LocMemCache, DummyCache))
+    except Exception:
+        return False
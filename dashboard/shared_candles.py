@@ -0,0 +1,151 @@
+import os
+import mmap
+import struct
+import threading
+import numpy as np
+import pandas as pd
+
+from .candle_store import OHLCV_COLUMNS
+from .market_calendar import IST
+
+
+# tmpfs is RAM, so mapped files there are shared memory between the workers
+DEFAULT_SHARED_DIR = '/dev/shm/trading-alerts-candles' if os.path.isdir('/dev/shm') else os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), 'data', 'shared_candles'
+)
+
+MAGIC = b'CNDL'
+VERSION = 1
+
+# magic, version, flags, rows, bar start (ns), size (-1 if none)
+HEADER = struct.Struct('<4sHH8xqqq')
+
+# Header flags
+TZ_AWARE = 1
+INTEGER_VOLUME = 2
+
+
+class SharedCandleCache:
+    """Candle frames shared by every worker process on a host through memory-mapped files
+
+    Each (symbol, timeframe, namespace) is one file: a fixed header (the bar
+    it was fetched in, its size and row count) followed by the timestamp and
+    OHLCV columns as contiguous 8-byte arrays. Writers build the file aside
+    and rename it into place, so readers need no lock: they map whichever
+    complete version is there and get DataFrames over the mapped pages, which
+    all processes share instead of each holding its own copy.
+    """
+
+    def __init__(self, base_dir=None, enabled=None):
+        self.base_dir = base_dir or os.getenv('SHARED_CANDLE_DIR', DEFAULT_SHARED_DIR)
+        if enabled is None:
+            enabled = os.getenv('SHARED_CANDLE_CACHE', '1') == '1'
+        self.enabled = enabled
+        # Frames mapped by this process, per file version
+        self._mapped = {}
+        self._lock = threading.Lock()
+
+    def _path(self, symbol, timeframe, namespace):
+        return os.path.join(self.base_dir, f"{namespace}_{timeframe}_{symbol}.bin")
+
+    def get(self, symbol, timeframe, bar_start, size=None, namespace='frame'):
+        """Get the shared frame fetched in bar_start for at least size, or None"""
+        if not self.enabled:
+            return None
+
+        path = self._path(symbol, timeframe, namespace)
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+
+        version = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+        with self._lock:
+            entry = self._mapped.get(path)
+        if entry is None or entry[0] != version:
+            try:
+                entry = (version,) + self._map(path)
+            except Exception as e:
+                print(f"Error reading shared candles {path}: {str(e)}")
+                return None
+            with self._lock:
+                self._mapped[path] = entry
+
+        _, entry_bar_start, entry_size, df = entry
+        if entry_bar_start != pd.Timestamp(bar_start).value:
+            return None
+        if size is not None and entry_size is not None and entry_size < size:
+            return None
+        return df
+
+    def _map(self, path):
+        with open(path, 'rb') as f:
+            buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, version, flags, rows, bar_start, size = HEADER.unpack_from(buffer)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError("not a shared candle file")
+
+        def column(number, dtype):
+            return np.frombuffer(buffer, dtype=dtype, count=rows, offset=HEADER.size + 8 * rows * number)
+
+        index = pd.to_datetime(column(0, np.int64), utc=True)
+        index = index.tz_convert(IST) if flags & TZ_AWARE else index.tz_localize(None)
+        data = {
+            name: column(number, np.int64 if name == 'volume' and flags & INTEGER_VOLUME else np.float64)
+            for number, name in enumerate(OHLCV_COLUMNS, start=1)
+        }
+        df = pd.DataFrame(data, index=pd.DatetimeIndex(index, name='timestamp'), copy=False)
+        return bar_start, (size if size >= 0 else None), df
+
+    def put(self, symbol, timeframe, bar_start, df, size=None, namespace='frame'):
+        """Publish a frame fetched in bar_start for other processes to read"""
+        if not self.enabled or df is None:
+            return
+
+        index = pd.DatetimeIndex(df.index)
+        flags = 0
+        if index.tz is not None:
+            flags |= TZ_AWARE
+        integer_volume = pd.api.types.is_integer_dtype(df['volume'])
+        if integer_volume:
+            flags |= INTEGER_VOLUME
+
+        header = HEADER.pack(
+            MAGIC, VERSION, flags, len(df), pd.Timestamp(bar_start).value,
+            size if size is not None else -1
+        )
+        path = self._path(symbol, timeframe, namespace)
+        temp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            os.makedirs(self.base_dir, exist_ok=True)
+            with open(temp_path, 'wb') as f:
+                f.write(header)
+                f.write(np.ascontiguousarray(index.as_unit('ns').asi8, dtype=np.int64).tobytes())
+                for name in OHLCV_COLUMNS:
+                    dtype = np.int64 if name == 'volume' and integer_volume else np.float64
+                    f.write(np.ascontiguousarray(df[name].to_numpy(dtype=dtype)).tobytes())
+            os.replace(temp_path, path)
+        except Exception as e:
+            print(f"Error writing shared candles for {symbol}: {str(e)}")
+            try:
+                os.remove(temp_path)
+            except OSError:
+                pass
+
+    def clear(self):
+        """Remove every shared frame"""
+        with self._lock:
+            self._mapped.clear()
+        if not os.path.isdir(self.base_dir):
+            return
+        for name in os.listdir(self.base_dir):
+            if name.endswith('.bin'):
+                try:
+                    os.remove(os.path.join(self.base_dir, name))
+                except OSError:
+                    pass
+
+
+# Frames shared with the other worker processes on this host
+shared_candles = SharedCandleCache()
@@ -0,0 +1,43 @@
+from django.db.models.signals import post_save, post_delete, m2m_changed
+from django.dispatch import receiver
+from .models import Alert, Indicator, Stock, StockGroup
+from .plans import alert_plans
+from .alert_index import alert_index
+
+@receiver(post_save, sender=Alert)
+@receiver(post_delete, sender=Alert)
+def invalidate_alert_plan(sender, instance, **kwargs):
+    alert_plans.invalidate(instance.pk)
+
+@receiver(post_save, sender=Indicator)
+@receiver(post_delete, sender=Indicator)
+def invalidate_indicator_plans(sender, instance, **kwargs):
+    # Plans hold the indicator name, so every plan may be affected
+    alert_plans.clear()
+
+@receiver(post_save, sender=Alert)
+def index_alert(sender, instance, **kwargs):
+    alert_index.update_alert(instance)
+
+@receiver(post_delete, sender=Alert)
+def unindex_alert(sender, instance, **kwargs):
+    alert_index.remove_alert(instance.pk)
+
+@receiver(m2m_changed, sender=StockGroup.stocks.through)
+def reindex_group_alerts(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    if not reverse:
+        alert_index.update_groups([instance.pk])
+    elif pk_set:
+        # A stock was added to or removed from these groups
+        alert_index.update_groups(pk_set)
+    else:
+        alert_index.update_groups()
+
+@receiver(post_save, sender=Stock)
+@receiver(post_delete, sender=Stock)
+def reindex_stock_alerts(sender, instance, created=False, **kwargs):
+    # A renamed or deleted stock changes keys across alerts and groups
+    if not created:
+        alert_index.invalidate()
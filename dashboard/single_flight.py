@@ -0,0 +1,106 @@
+import os
+import threading
+import time
+
+from .shared_cache import is_shared, shared_cache
+
+
+_MISSING = object()
+
+
+class _Call:
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """Coalesces concurrent identical calls into one
+
+    Within a process, threads asking for a key that is already in flight wait
+    for that call and share its result. Across processes, a lock in the Django
+    cache elects one caller per key; the others wait for the lock to be
+    released and read the published result from the cache. With a per-process
+    cache backend this degrades to in-process coalescing only.
+    """
+
+    def __init__(self, lock_timeout=30, result_ttl=10, poll_interval=0.05):
+        self.lock_timeout = lock_timeout
+        self.result_ttl = result_ttl
+        self.poll_interval = poll_interval
+        self.coalesced = 0
+        self._calls = {}
+        self._lock = threading.Lock()
+
+    def do(self, key, fn):
+        """Run fn() once for all concurrent callers using the same key and return its result"""
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+            else:
+                self.coalesced += 1
+
+        if not leader:
+            call.event.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = self._do_shared(key, fn)
+            return call.result
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.event.set()
+
+    def _do_shared(self, key, fn):
+        # A per-process cache cannot coordinate anything the in-process path does not
+        if not is_shared():
+            return fn()
+        cache = shared_cache()
+
+        lock_key = f"singleflight:lock:{key}"
+        result_key = f"singleflight:result:{key}"
+        deadline = time.monotonic() + self.lock_timeout
+
+        while True:
+            try:
+                acquired = cache.add(lock_key, os.getpid(), self.lock_timeout)
+            except Exception as e:
+                print(f"Cache unavailable for request coalescing: {str(e)}")
+                return fn()
+
+            if acquired:
+                try:
+                    result = fn()
+                    # Wrapped so that a None result is distinguishable from a miss
+                    cache.set(result_key, (result,), self.result_ttl)
+                    return result
+                finally:
+                    cache.delete(lock_key)
+
+            # Another process is making this call; wait for it to publish
+            while cache.get(lock_key) is not None and time.monotonic() < deadline:
+                time.sleep(self.poll_interval)
+
+            published = cache.get(result_key, _MISSING)
+            if published is not _MISSING:
+                with self._lock:
+                    self.coalesced += 1
+                return published[0]
+
+            if time.monotonic() >= deadline:
+                return fn()
+
+            # The other process failed without a result; try to take over
+
+
+# Coalescer shared by every Angel One client in this process
+single_flight = SingleFlight()
@@ -0,0 +1,279 @@
+import json
+import threading
+import time
+import pandas as pd
+
+from .candle_cache import TIMEFRAME_DELTAS
+from .candle_ring import CandleRing
+from .market_calendar import IST, market_calendar, session_bar_starts, to_ist
+
+
+# Exchange segment codes used by the SmartAPI websocket
+EXCHANGE_TYPES = {'NSE': 1, 'BSE': 3}
+
+# Websocket subscription mode carrying LTP and day volume
+QUOTE_MODE = 2
+
+
+class BarBuilder:
+    """Builds OHLCV bars in memory from ticks for every subscribed symbol and timeframe
+
+    Bars are aligned to the session like the rolled-up history (4h bars
+    start at 09:15 and 13:15) and only ticks inside the regular session are
+    used. Completed bars are kept per (symbol, timeframe) in a fixed-capacity
+    CandleRing, after any seeded history, so closing a bar writes in place.
+    on_bar_close(symbol, timeframe, bars) is called with the series' ring as
+    soon as a bar closes, so no DataFrame is built per bar.
+    """
+
+    def __init__(self, timeframes=None, max_bars=500, on_bar_close=None):
+        self.timeframes = list(timeframes or TIMEFRAME_DELTAS)
+        self.max_bars = max_bars
+        self.on_bar_close = on_bar_close
+        self._forming = {}
+        self._completed = {}
+        self._day_volume = {}
+        self._lock = threading.Lock()
+
+    def seed(self, symbol, timeframe, historical_data, now=None):
+        """Start a series from already-fetched candles so indicators have their lookback
+
+        The bar still forming at now is left out; it is built from the ticks.
+        """
+        from .services import closed_bars
+
+        if historical_data is None or historical_data.empty:
+            return
+
+        df = historical_data
+        if 'timestamp' in df.columns:
+            df = df.set_index('timestamp')
+
+        last_close = market_calendar.last_bar_close(timeframe, now)
+        if last_close is not None:
+            df = closed_bars(df, last_close)
+
+        bars = CandleRing(self.max_bars)
+        bars.extend(df)
+
+        with self._lock:
+            self._completed[(symbol, timeframe)] = bars
+
+    def on_tick(self, symbol, price, timestamp, day_volume=None):
+        """Add one trade tick to every timeframe of a symbol, closing bars that have ended"""
+        timestamp = to_ist(timestamp)
+        if not market_calendar.is_market_open(timestamp):
+            return
+        closed = []
+
+        with self._lock:
+            # Ticks carry the cumulative day volume; bars need the traded delta
+            volume = 0
+            if day_volume is not None:
+                previous = self._day_volume.get(symbol)
+                if previous is not None and day_volume >= previous:
+                    volume = day_volume - previous
+                self._day_volume[symbol] = day_volume
+
+            for timeframe in self.timeframes:
+                key = (symbol, timeframe)
+                bar = self._forming.get(key)
+
+                # A forming bar is [start, open, high, low, close, volume, close time]
+                if bar is not None and timestamp >= bar[6]:
+                    closed.append(self._close(key, bar))
+                    bar = None
+
+                if bar is None:
+                    bar_start = session_bar_starts(pd.DatetimeIndex([timestamp]), timeframe)[0]
+                    self._forming[key] = [
+                        bar_start, price, price, price, price, volume,
+                        market_calendar.next_bar_close(timeframe, bar_start),
+                    ]
+                elif timestamp >= bar[0]:
+                    bar[2] = max(bar[2], price)
+                    bar[3] = min(bar[3], price)
+                    bar[4] = price
+                    bar[5] += volume
+
+        self._notify(closed)
+
+    def flush(self, now=None):
+        """Close bars whose period has ended even though no newer tick arrived"""
+        now = to_ist(now if now is not None else pd.Timestamp.now(tz=IST))
+        closed = []
+
+        with self._lock:
+            for key, bar in list(self._forming.items()):
+                if now >= bar[6]:
+                    closed.append(self._close(key, bar))
+                    del self._forming[key]
+
+        self._notify(closed)
+
+    def _close(self, key, bar):
+        bars = self._completed.get(key)
+        if bars is None:
+            bars = self._completed[key] = CandleRing(self.max_bars)
+        elif bars.last_timestamp is not None and bar[0] <= bars.last_timestamp:
+            # Already in the seeded history
+            return None
+        bars.append(*bar[:6])
+        return key
+
+    def _notify(self, closed):
+        if not self.on_bar_close:
+            return
+        for symbol, timeframe in filter(None, closed):
+            self.on_bar_close(symbol, timeframe, self.ring(symbol, timeframe))
+
+    def ring(self, symbol, timeframe):
+        """Get the completed bars of a series as a CandleRing, or None
+
+        Its column views are only stable until the next bar of the series
+        closes, so read them in on_bar_close or copy them.
+        """
+        with self._lock:
+            return self._completed.get((symbol, timeframe))
+
+
+class ReplayWebSocket:
+    """Local stand-in for SmartWebSocketV2 that replays recorded ticks
+
+    The recording is a JSON-lines file of websocket messages as parsed by
+    SmartWebSocketV2 (token, exchange_type, exchange_timestamp in ms,
+    last_traded_price in paise, volume_trade_for_the_day). Only subscribed
+    tokens are delivered; speed scales the original inter-tick delays, and
+    0 replays as fast as possible.
+    """
+
+    def __init__(self, path, speed=0):
+        self.path = path
+        self.speed = speed
+        self.subscribed = set()
+        self.on_open = None
+        self.on_data = None
+        self.on_close = None
+        self._closed = False
+
+    def subscribe(self, correlation_id, mode, token_list):
+        for group in token_list:
+            for token in group['tokens']:
+                self.subscribed.add((group['exchangeType'], str(token)))
+
+    def connect(self):
+        if self.on_open:
+            self.on_open(self)
+
+        previous = None
+        with open(self.path) as f:
+            for line in f:
+                if self._closed:
+                    break
+                if not line.strip():
+                    continue
+
+                message = json.loads(line)
+                if (message.get('exchange_type'), str(message.get('token'))) not in self.subscribed:
+                    continue
+
+                if self.speed and previous is not None:
+                    time.sleep(max(0, message['exchange_timestamp'] - previous) / 1000 / self.speed)
+                previous = message['exchange_timestamp']
+
+                self.on_data(self, message)
+
+        if self.on_close:
+            self.on_close(self)
+
+    def close_connection(self):
+        self._closed = True
+
+
+class TickStream:
+    """Feeds websocket ticks for a set of symbols into a BarBuilder
+
+    Parameters:
+    symbols (iterable): (symbol, exchange) pairs to subscribe to
+    builder (BarBuilder): Receives every tick
+    websocket: SmartWebSocketV2 or ReplayWebSocket; defaults to a live
+               SmartWebSocketV2 authenticated through the shared session
+    """
+
+    def __init__(self, symbols, builder, websocket=None):
+        from .instruments import resolve_token
+
+        self.builder = builder
+        self.websocket = websocket or self._connect_live()
+
+        # (exchange_type, token) -> symbol, to map ticks back to symbols
+        self.symbols_by_token = {}
+        for symbol, exchange in symbols:
+            token = resolve_token(symbol, exchange)
+            if token is None:
+                print(f"Unknown symbol {symbol} on {exchange}; not streaming it")
+                continue
+            self.symbols_by_token[(EXCHANGE_TYPES.get(exchange, 1), str(token))] = symbol
+
+        self.websocket.on_open = self._on_open
+        self.websocket.on_data = self._on_data
+
+    def _connect_live(self):
+        from SmartApi.smartWebSocketV2 import SmartWebSocketV2
+        from .angel_one import get_angel_one_api
+
+        api = get_angel_one_api()
+        if api is None:
+            raise ConnectionError("Failed to connect to Angel One API")
+
+        return SmartWebSocketV2(api.token, api.api_key, api.client_id, api.feed_token)
+
+    def _on_open(self, wsapp):
+        token_lists = {}
+        for exchange_type, token in self.symbols_by_token:
+            token_lists.setdefault(exchange_type, []).append(token)
+
+        self.websocket.subscribe(
+            'alerts',
+            QUOTE_MODE,
+            [{'exchangeType': exchange_type, 'tokens': tokens} for exchange_type, tokens in token_lists.items()]
+        )
+        print(f"Subscribed to ticks for {len(self.symbols_by_token)} symbols")
+
+    def _on_data(self, wsapp, message):
+        symbol = self.symbols_by_token.get((message.get('exchange_type'), str(message.get('token'))))
+        if symbol is None or message.get('last_traded_price') is None:
+            return
+
+        self.builder.on_tick(
+            symbol,
+            message['last_traded_price'] / 100,
+            pd.Timestamp(message['exchange_timestamp'], unit='ms', tz='UTC'),
+            message.get('volume_trade_for_the_day'),
+        )
+
+    def run(self, flush_interval=1.0):
+        """Stream until the connection closes, closing idle bars every flush_interval seconds
+
+        Pass flush_interval=None when replaying recorded ticks, whose bars must
+        only be closed by later ticks rather than by the wall clock.
+        """
+        if flush_interval is None:
+            self.websocket.connect()
+            return
+
+        stop = threading.Event()
+
+        def flush_loop():
+            while not stop.wait(flush_interval):
+                self.builder.flush()
+
+        flusher = threading.Thread(target=flush_loop, daemon=True)
+        flusher.start()
+        try:
+            self.websocket.connect()
+        finally:
+            stop.set()
+
+    def close(self):
+        self.websocket.close_connection()
@@ -1,4 +1,7 @@
-from angel_one import AngelOneAPI
+# Run from the project root: python -m dashboard.test_trading_alert_system
+from dashboard.angel_one import AngelOneAPI, get_angel_one_api
+from dashboard.instruments import instrument_index, resolve_token
+from dashboard.candle_store import candle_store
 import pandas as pd
 import numpy as np
 import requests
@@ -9,13 +12,13 @@ import time
 
 class TradingAlertSystem:
     def __init__(self):
-        self.api = AngelOneAPI()
+        # Reuse the shared session; fall back to an unauthenticated client for header-only calls
+        self.api = get_angel_one_api() or AngelOneAPI()
+        # Tokens are resolved through the cached instrument master
+        instrument_index.update()
         self.symbols = [
-            {"symbol": "RELIANCE", "token": "2885", "exchange": "NSE"},
-            {"symbol": "INFY", "token": "1594", "exchange": "NSE"},
-            {"symbol": "HDFCBANK", "token": "1333", "exchange": "NSE"},
-            {"symbol": "TCS", "token": "11536", "exchange": "NSE"},
-            {"symbol": "TATASTEEL", "token": "3499", "exchange": "NSE"}
+            {"symbol": symbol, "token": resolve_token(symbol, "NSE"), "exchange": "NSE"}
+            for symbol in ["RELIANCE", "INFY", "HDFCBANK", "TCS", "TATASTEEL"]
         ]
         
         # Alert conditions
@@ -38,35 +41,33 @@ class TradingAlertSystem:
         print("\n=== FETCHING REAL-TIME QUOTES ===")
         
         quotes_data = {}
+        
+        # Fetch all symbols in one batched quote request
+        print(f"Fetching quotes for {len(self.symbols)} symbols...")
+        fetched = self.api.get_quotes({
+            symbol_info["symbol"]: (symbol_info["exchange"], symbol_info["token"])
+            for symbol_info in self.symbols
+        })
+        
         for symbol_info in self.symbols:
             symbol = symbol_info["symbol"]
-            exchange = symbol_info["exchange"]
-            token = symbol_info["token"]
+            symbol_data = fetched.get(symbol)
             
-            print(f"Fetching quote for {symbol}...")
-            quote = self.api.get_quote(exchange, token)
-            
-            if quote and quote.get('status') and quote.get('message') == "SUCCESS":
-                # Correct format: data -> fetched -> array of fetched symbols
-                fetched_data = quote.get('data', {}).get('fetched', [])
-                if fetched_data and len(fetched_data) > 0:
-                    symbol_data = fetched_data[0]  # Get the first symbol data
-                    quotes_data[symbol] = {
-                        "ltp": symbol_data.get('ltp'),
-                        "open": symbol_data.get('open'),
-                        "high": symbol_data.get('high'),
-                        "low": symbol_data.get('low'),
-                        "close": symbol_data.get('close'),
-                        "volume": symbol_data.get('tradeVolume'),
-                        "timestamp": symbol_data.get('exchTradeTime'),
-                        "change": symbol_data.get('netChange'),
-                        "change_percent": symbol_data.get('percentChange')
-                    }
-                    print(f"  ✓ {symbol}: ₹{symbol_data.get('ltp')} ({symbol_data.get('percentChange')}%)")
-                else:
-                    print(f"  ✗ {symbol}: No data found")
+            if symbol_data:
+                quotes_data[symbol] = {
+                    "ltp": symbol_data.get('ltp'),
+                    "open": symbol_data.get('open'),
+                    "high": symbol_data.get('high'),
+                    "low": symbol_data.get('low'),
+                    "close": symbol_data.get('close'),
+                    "volume": symbol_data.get('tradeVolume'),
+                    "timestamp": symbol_data.get('exchTradeTime'),
+                    "change": symbol_data.get('netChange'),
+                    "change_percent": symbol_data.get('percentChange')
+                }
+                print(f"  ✓ {symbol}: ₹{symbol_data.get('ltp')} ({symbol_data.get('percentChange')}%)")
             else:
-                print(f"  ✗ {symbol}: Error fetching quote")
+                print(f"  ✗ {symbol}: No data found")
                 
         return quotes_data
     
@@ -115,8 +116,9 @@ class TradingAlertSystem:
                         for col in ['open', 'high', 'low', 'close', 'volume']:
                             df[col] = pd.to_numeric(df[col])
                         
-                        # Save raw data
+                        # Save raw data, and keep it in the candle archive
                         df.to_csv(f"data/{symbol}_raw.csv")
+                        candle_store.merge(symbol, exchange, "ONE_DAY", df)
                         
                         print(f"  ✓ Got {len(df)} days of data for {symbol}")
                         return df
@@ -138,7 +140,7 @@ class TradingAlertSystem:
             
         try:
             # Add technical indicators
-            df = self.api.add_indicators(df)
+            df = self.api.add_indicators(df).materialize()
                 
             # Save with indicators
             df.to_csv(f"data/{symbol}_with_indicators.csv")
@@ -220,7 +222,7 @@ class TradingAlertSystem:
                     try:
                         # Add indicators if needed
                         if 'rsi' not in df.columns:
-                            df = self.api.add_indicators(df)
+                            df = self.api.add_indicators(df).materialize()
                             
                         latest = df.iloc[-1]
                         indicator_summary[symbol] = {
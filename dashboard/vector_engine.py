@@ -0,0 +1,149 @@
+import numpy as np
+
+
+def rolling_mean(values, window):
+    """Mean over the trailing window along the time axis; NaN until the window is full"""
+    valid = ~np.isnan(values)
+    filled = np.where(valid, values, 0.0)
+
+    sums = np.cumsum(filled, axis=1)
+    counts = np.cumsum(valid, axis=1)
+    sums[:, window:] = sums[:, window:] - sums[:, :-window]
+    counts[:, window:] = counts[:, window:] - counts[:, :-window]
+
+    with np.errstate(invalid='ignore'):
+        result = sums / window
+    result[counts < window] = np.nan
+    return result
+
+
+def rolling_std(values, window):
+    """Population standard deviation over the trailing window along the time axis"""
+    mean = rolling_mean(values, window)
+    variance = rolling_mean(values * values, window) - mean * mean
+    return np.sqrt(np.maximum(variance, 0.0))
+
+
+def bollinger_band(band):
+    """Get a kernel for one Bollinger band: 'upper', 'middle' or 'lower'"""
+    sign = {'upper': 1.0, 'middle': 0.0, 'lower': -1.0}[band]
+
+    def kernel(values, period, num_std):
+        mean = rolling_mean(values, period)
+        if not sign:
+            return mean
+        return mean + sign * num_std * rolling_std(values, period)
+    return kernel
+
+
+def price(values):
+    """The closes themselves"""
+    return values
+
+
+def ewm_mean(values, span):
+    """Exponential moving average along the time axis, as ewm(span, adjust=False).mean()
+
+    Loops over bars, not symbols: each step updates every symbol at once.
+    """
+    alpha = 1.0 / (1.0 + (span - 1) / 2.0)
+    old_wt = 1.0 - alpha
+
+    result = np.empty_like(values)
+    weighted = values[:, 0].copy()
+    result[:, 0] = weighted
+    for t in range(1, values.shape[1]):
+        current = values[:, t]
+        blended = (old_wt * weighted + alpha * current) / (old_wt + alpha)
+        # Start at the first observation; keep the average through missing bars
+        weighted = np.where(
+            np.isnan(weighted), current,
+            np.where(np.isnan(current) | (weighted == current), weighted, blended)
+        )
+        result[:, t] = weighted
+    return result
+
+
+def rsi(values, period):
+    """RSI over simple averages of gains and losses, as calculate_rsi"""
+    delta = np.full_like(values, np.nan)
+    delta[:, 1:] = values[:, 1:] - values[:, :-1]
+
+    # Bars before a symbol's first close stay NaN; its first delta counts as no change
+    started = ~np.isnan(values)
+    gain = np.where(started, np.where(delta > 0, delta, 0.0), np.nan)
+    loss = np.where(started, np.where(delta < 0, -delta, 0.0), np.nan)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        rs = rolling_mean(gain, period) / rolling_mean(loss, period)
+        return 100 - (100 / (1 + rs))
+
+
+def macd_line(values, fast_period, slow_period, signal_period):
+    """MACD line (fast EMA - slow EMA), as calculate_macd; the signal period is not needed for it"""
+    return ewm_mean(values, fast_period) - ewm_mean(values, slow_period)
+
+
+class CrossSectionalEngine:
+    """Indicators for every symbol of a timeframe at once, over a symbols x bars matrix
+
+    Each row holds one symbol's closes, aligned on its latest bar and padded
+    with NaN on the left where its history is shorter. Every distinct
+    indicator is computed once for all symbols, and alert conditions are
+    evaluated as array comparisons on the latest column.
+    """
+
+    def __init__(self, symbols, closes, timestamps=None):
+        self.symbols = list(symbols)
+        self.rows = {symbol: row for row, symbol in enumerate(self.symbols)}
+        self.closes = closes
+        self.timestamps = timestamps or {}
+        self._latest = {}
+        self.computed = 0
+
+    @classmethod
+    def from_frames(cls, frames):
+        """Build the engine from {symbol: candle frame}; empty frames are left out"""
+        frames = {symbol: df for symbol, df in frames.items() if df is not None and not df.empty}
+        length = max((len(df) for df in frames.values()), default=0)
+
+        closes = np.full((len(frames), length), np.nan)
+        for row, df in enumerate(frames.values()):
+            closes[row, length - len(df):] = df['close'].to_numpy(dtype=float)
+
+        timestamps = {symbol: df.index[-1] for symbol, df in frames.items()}
+        return cls(frames.keys(), closes, timestamps)
+
+    def latest(self, indicator):
+        """Get the latest value of a compiled indicator for every symbol, in row order"""
+        if indicator.key not in self._latest:
+            kernel = indicator.spec.vector_kernel if indicator.spec else None
+            if kernel is None or not self.symbols:
+                values = None
+            else:
+                values = kernel(self.closes, *[value for _, value in indicator.params])[:, -1]
+                self.computed += 1
+            self._latest[indicator.key] = values
+        return self._latest[indicator.key]
+
+    def evaluate(self, plan, symbols):
+        """Evaluate an alert plan for some symbols
+
+        Returns:
+        list: (symbol, indicator1_value, indicator2_value) for each symbol that triggered
+        """
+        rows = [self.rows[symbol] for symbol in symbols if symbol in self.rows]
+        indicator1 = self.latest(plan.indicator1)
+        indicator2 = self.latest(plan.indicator2)
+        if not rows or indicator1 is None or indicator2 is None or plan.compare is None:
+            return []
+
+        rows = np.array(rows)
+        values1, values2 = indicator1[rows], indicator2[rows]
+        # Comparisons with NaN are false, so a missing value never triggers
+        triggered = plan.compare(values1, values2)
+
+        return [
+            (self.symbols[row], values1[i], values2[i])
+            for i, row in enumerate(rows) if triggered[i]
+        ]
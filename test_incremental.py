@@ -0,0 +1,87 @@
+import json
+import math
+import numpy as np
+import pandas as pd
+
+from dashboard.kernels import calculate_sma, calculate_ema, calculate_rsi, calculate_macd
+from dashboard.incremental import SMAState, EMAState, RSIState, MACDState, state_from_dict
+
+
+# Batch calculation each incremental state must reproduce bit for bit
+CASES = [
+    ('SMA(14)', lambda: SMAState(14), lambda close: calculate_sma(close, 14)),
+    ('SMA(1)', lambda: SMAState(1), lambda close: calculate_sma(close, 1)),
+    ('EMA(9)', lambda: EMAState(9), lambda close: calculate_ema(close, 9)),
+    ('EMA(50)', lambda: EMAState(50), lambda close: calculate_ema(close, 50)),
+    ('RSI(14)', lambda: RSIState(14), lambda close: calculate_rsi(close, 14)),
+    ('RSI(2)', lambda: RSIState(2), lambda close: calculate_rsi(close, 2)),
+    ('MACD(12,26,9)', lambda: MACDState(12, 26, 9), lambda close: calculate_macd(close, 12, 26, 9)[0]),
+]
+
+
+def sample_series():
+    """Close series covering random walks, flat runs and float32 prices"""
+    rng = np.random.default_rng(7)
+    walk = 100 + rng.normal(0, 1, size=2000).cumsum()
+    steps = np.repeat(rng.uniform(50, 150, size=40), 25)
+    return {
+        'random walk': pd.Series(walk),
+        'flat': pd.Series(np.full(300, 101.25)),
+        'flat runs': pd.Series(steps),
+        'float32 prices': pd.Series(walk.astype(np.float32)),
+        'near zero': pd.Series(rng.normal(0, 1e-6, size=500)),
+    }
+
+
+def same(a, b):
+    """Bit-for-bit equality, treating NaN as equal to NaN"""
+    if math.isnan(a) and math.isnan(b):
+        return True
+    return np.float64(a).tobytes() == np.float64(b).tobytes()
+
+
+def mismatches(state, expected, closes, start=0):
+    """Feed closes[start:] into a state and list (position, incremental, batch) where they differ"""
+    return [
+        (position, value, expected[position])
+        for position, value in enumerate((state.update(close) for close in closes[start:]), start=start)
+        if not same(value, expected[position])
+    ]
+
+
+def test_matches_batch():
+    """Every value after each update equals the batch calculation over the same closes"""
+    for series_name, close in sample_series().items():
+        closes = close.to_numpy(dtype=float)
+        for name, create, batch in CASES:
+            expected = batch(close).to_numpy(dtype=float)
+            failed = mismatches(create(), expected, closes)
+            assert not failed, f"{name} on {series_name}: {len(failed)} mismatches, first {failed[0]}"
+
+
+def test_round_trip():
+    """A state rebuilt from to_dict() through JSON continues exactly where it stopped"""
+    for series_name, close in sample_series().items():
+        closes = close.to_numpy(dtype=float)
+        half = len(closes) // 2
+        for name, create, batch in CASES:
+            expected = batch(close).to_numpy(dtype=float)
+            state = create()
+            for value in closes[:half]:
+                state.update(value)
+
+            restored = state_from_dict(json.loads(json.dumps(state.to_dict())))
+            assert same(restored.value, state.value), f"{name} on {series_name}: value changed in the round trip"
+
+            failed = mismatches(restored, expected, closes, start=half)
+            assert not failed, f"{name} on {series_name} after a round trip: {len(failed)} mismatches, first {failed[0]}"
+
+
+if __name__ == "__main__":
+    print("=== Incremental Indicator Verification ===")
+    for check in (test_matches_batch, test_round_trip):
+        try:
+            check()
+            print(f"✓ {check.__doc__}")
+        except AssertionError as e:
+            print(f"✗ {check.__doc__}\n    {str(e)}")